@@ -1,6 +1,7 @@
 
 import sys
-import yaml
+import numpy as np
+import pandas as pd
 from pathlib import Path
 from datetime import datetime as dt,timedelta as td
 
@@ -8,41 +9,35 @@ sys.path=[str(Path().cwd())] + sys.path
 from src.ezdb_connection.sql_strs import get_economic_bid
 from src.ezdb_connection.ezdb_connection \
     import EZBDConnection
+from src.utils.parquet_functions import write_parquet
+from src.utils.config_functions import load_config
 
 if __name__=='__main__':
-    with open('config/config.yaml','r') as f:
-        config = yaml.safe_load(f)
-    with open('config/login.yaml','r') as f:
-        login_credentials = yaml.safe_load(f)
+    config = load_config('config/config.yaml')
+    login_credentials = load_config('config/login.yaml')
 
     start_datetime = dt(min(config['ucap_analysis']['years']),1,1,0,0)
     end_datetime = dt(max(config['ucap_analysis']['years'])+1,1,1,0,0)
 
-    sql_str = get_economic_bid(start_datetime=start_datetime,end_datetime=end_datetime)
+    sql_str,params = get_economic_bid(start_datetime=start_datetime,end_datetime=end_datetime)
 
     # Retrieve economic bid data from EZDB:
     ezdbc = EZBDConnection(login_credentials)
-    economic_bid_data = ezdbc.execute_query(sql_str)
+    economic_bid_data = ezdbc.execute_query(sql_str,params)
 
-    # Identify hours when Dispatch Price > Bid Price:
-    economic_bid_data.loc[
-        :,
-        [
-            'RTM_DISPATCH_QUANTITY',
-            'RTM_DISPATCH_PRICE',
-            'RTM_BID_QUANTITY',
-            'RTM_BID_PRICE',
-            'DAM_DISPATCH_QUANTITY',
-            'DAM_DISPATCH_PRICE',
-            'DAM_BID_QUANTITY',
-            'DAM_BID_PRICE',
-            'DAM_SELFSCHEDMW',
-            'RUC_DISPATCH_QUANTITY'
-        ]
-    ].fillna(0,inplace=True)
-    economic_bid_data.loc[:,'DEMAND HOUR'] = economic_bid_data.loc[:,'RTM_DISPATCH_PRICE']>economic_bid_data.loc[:,'RTM_BID_PRICE']
-    resource_level_demand_hours = economic_bid_data.loc[:,['ResID','DateTime','DEMAND HOUR']]
-    resource_level_demand_hours.rename(columns={'ResID':'RESOURCE ID','DateTime':'START DATETIME'},inplace=True)
-    resource_level_demand_hours.loc[:,'END DATETIME'] = resource_level_demand_hours.loc[:,'START DATETIME'] + td(hours=1)
-    resource_level_demand_hours = resource_level_demand_hours.loc[:,['RESOURCE ID','START DATETIME','END DATETIME','DEMAND HOUR']]
-    resource_level_demand_hours.to_parquet(Path(config['demand_hours_analysis']['resource_demand_hours_path']),index=False)
+    # Identify hours when Dispatch Price > Bid Price, treating missing prices
+    # as non-demand hours since comparisons against NaN evaluate to False:
+    dispatch_price = economic_bid_data.loc[:,'RTM_DISPATCH_PRICE'].to_numpy(dtype='float64',na_value=np.nan)
+    bid_price = economic_bid_data.loc[:,'RTM_BID_PRICE'].to_numpy(dtype='float64',na_value=np.nan)
+    start_datetimes = economic_bid_data.loc[:,'DateTime']
+    resource_level_demand_hours = pd.DataFrame({
+        'RESOURCE ID' : economic_bid_data.loc[:,'ResID'].to_numpy(),
+        'START DATETIME' : start_datetimes.to_numpy(),
+        'END DATETIME' : (start_datetimes + td(hours=1)).to_numpy(),
+        'DEMAND HOUR' : np.greater(dispatch_price,bid_price),
+    })
+    write_parquet(
+        resource_level_demand_hours,
+        Path(config['demand_hours_analysis']['resource_demand_hours_path']),
+        ['RESOURCE ID']
+    )
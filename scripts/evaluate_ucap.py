@@ -1,13 +1,13 @@
 import sys
-import yaml
 import pandas as pd
 from datetime import date as d,time as t,datetime as dt,timedelta as td
 from pathlib import Path
 
 sys.path=[str(Path().cwd())] + sys.path
 from src.ucap_evaluator.ucap_evaluator import UCAPEvaluator
-from src.utils.datetime_functions import select_hours_within_datetime_range,coalesce_hour_filter
+from src.utils.datetime_functions import select_hours_within_datetime_ranges,coalesce_hour_filter
 from src.utils.string_functions import replace_template_placeholders
+from src.utils.config_functions import load_config
 
 def evaluate_ucap():
     '''
@@ -15,39 +15,56 @@ def evaluate_ucap():
     demand hours (EFORd) within the years and seasons specified in the
     configuration file.
     '''
-    with open('config/config.yaml','r') as f:
-        config = yaml.safe_load(f)
+    config = load_config('config/config.yaml')
 
     ucap_evaluator = UCAPEvaluator(config)
 
     years = config['ucap_analysis']['years']
     seasons = config['ucap_analysis']['seasons'].items()
-    df_out = pd.DataFrame()
+
+    # Assemble the datetime ranges making up each season of each year:
+    ranges = pd.DataFrame([
+        {
+            'YEAR' : year,
+            'SEASON' : season_name,
+            'START DATETIME' : dt.strptime(season_bound[0],'%b %d').replace(year=year),
+            'END DATETIME' : dt.strptime(season_bound[1],'%b %d').replace(year=year)+td(days=1),
+        }
+        for year in years for season_name,season_bounds in seasons for season_bound in season_bounds
+    ])
+
+    # Select hours within all ranges at once and tag each hour with its year
+    # and season:
+    hour_filters = select_hours_within_datetime_ranges(
+        ranges.loc[:,'START DATETIME'].to_numpy(),
+        ranges.loc[:,'END DATETIME'].to_numpy(),
+        ucap_evaluator.grid_hour_filter
+    )
+    hour_filters.loc[:,'YEAR'] = ranges.loc[hour_filters.loc[:,'RANGE'],'YEAR'].to_numpy()
+    hour_filters.loc[:,'SEASON'] = ranges.loc[hour_filters.loc[:,'RANGE'],'SEASON'].to_numpy()
+
+    # Coalesce the demand hours of each season of each year:
+    hour_filter_sets = {}
     for year in years:
-        for season in seasons:
-            season_name = season[0]
-            season_bounds = season[1]
-            start_datetimes = [dt.strptime(x[0],'%b %d').replace(year=year) for x in season_bounds]
-            end_datetimes = [dt.strptime(x[1],'%b %d').replace(year=year)+td(days=1) for x in season_bounds]
-
-            # Calculate Equivalent Forced Outage Rates during Demand Hours
-            # (EFORd):
-            hour_filter = ucap_evaluator.grid_hour_filter.copy()
-            hour_filter = pd.concat([
-                select_hours_within_datetime_range(
-                    start_datetime,
-                    end_datetime,
-                    hour_filter
-                )
-                for start_datetime,end_datetime in zip(start_datetimes,end_datetimes)
-            ],ignore_index=True)
+        for season_name,_ in seasons:
+            hour_filter = hour_filters.loc[
+                (hour_filters.loc[:,'YEAR']==year) & \
+                (hour_filters.loc[:,'SEASON']==season_name),
+                ['START DATETIME','END DATETIME','DEMAND HOUR']
+            ]
             hour_filter = coalesce_hour_filter(hour_filter)
-            hour_filter = hour_filter.loc[hour_filter.loc[:,'DEMAND HOUR'],:]
-            df = ucap_evaluator.calculate_equivalent_forced_outage_rate_during_shared_demand_hours(hour_filter)
-            original_columns = df.columns
-            df.loc[:,'YEAR'] = year
-            df.loc[:,'SEASON'] = season_name
-            df_out = pd.concat([df_out,df.loc[:,['YEAR','SEASON']+list(original_columns)]])
+            hour_filter_sets[(year,season_name)] = hour_filter.loc[hour_filter.loc[:,'DEMAND HOUR'],:]
+
+    # Calculate Equivalent Forced Outage Rates during Demand Hours (EFORd) for
+    # all years and seasons in a single pass over the curtailment data:
+    results = ucap_evaluator.calculate_equivalent_forced_outage_rates_during_shared_demand_hours(hour_filter_sets)
+    frames = []
+    for (year,season_name),df in results.items():
+        original_columns = df.columns
+        df.loc[:,'YEAR'] = year
+        df.loc[:,'SEASON'] = season_name
+        frames.append(df.loc[:,['YEAR','SEASON']+list(original_columns)])
+    df_out = pd.concat(frames)
 
     output_path = Path(replace_template_placeholders(
         config['ucap_analysis']['results']['outage_path_template'],
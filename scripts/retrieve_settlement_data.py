@@ -1,30 +1,38 @@
-import psycopg2
-import numpy as np
+import sys
 import pandas as pd
 from pathlib import Path
-from pandas import Timestamp as ts,Timedelta as td
-from pandas.tseries.offsets import MonthBegin,MonthEnd
-from login import pguser
+
+sys.path=[str(Path().cwd())] + sys.path
+from src.ezdb_connection.ezdb_connection import EZBDConnection
+from src.utils.config_functions import load_config
 
 
 resource_ids=pd.read_csv(r'M:\Users\RH2\src\caiso_curtailments\ResourceTypes_MRD2024-06.csv')
 
+# Resource types are bound as two array parameters and unnested on the server
+# rather than formatted into the query as a list of values:
 s='''
-WITH resource_types ("ResourceID","ResourceType") AS ( VALUES
-    {}
+WITH resource_types ("ResourceID","ResourceType") AS (
+    SELECT * FROM UNNEST(%s::text[],%s::text[])
 )
 
 SELECT
-"RESOURCE_TYPE",
-"DateTime",
-SUM("MWh") AS "MWH"
+b."ResourceType" AS "RESOURCE_TYPE",
+a."DateTime",
+SUM(a."MWh") AS "MWH"
 FROM caisosettlementdata as a
 LEFT JOIN resource_types as b
 on a."ResID"=b."ResourceID"
-GROUP BY "ResourceType", "DateTime"
+WHERE a."DateTime">='2019-03-10T00:00' AND a."DateTime"<='2019-03-10T05:00'
+GROUP BY b."ResourceType", a."DateTime"
 LIMIT 10
-WHERE "DateTime">='2019-03-10T00:00' AND "DateTime"<='2019-03-10T05:00'
-'''.format('\n            ,'.join([f'(\'{r[0][1]},{r[0][2]}\')' for r in resource_ids.iterrows()]))
-
-print(s)
+'''
+params = (
+    resource_ids.iloc[:,0].astype(str).tolist(),
+    resource_ids.iloc[:,1].astype(str).tolist(),
+)
 
+if __name__=='__main__':
+    login_credentials = load_config('config/login.yaml')
+    ezdb = EZBDConnection(login_credentials)
+    print(ezdb.execute_query(s,params=params))
@@ -1,18 +1,22 @@
 import io
+import os
+import shutil
 import pycurl
+import numpy as np
 from pathlib import Path
 import pandas as pd
 from pandas import Timestamp as ts
 from datetime import date as d, timedelta as td
-from openpyxl import load_workbook
 
 from src.logging.logging import DataLogger,TextLogger
+from src.utils.parquet_functions import append_parquet_dataset
 
 class CurtailmentReportDownloader:
     '''
     A class to manage downloads of CAISO daily curtailment reports.
     '''
     start_date = d(2021,6,18)
+    max_concurrent_downloads = 16
     column_names = [
         'OUTAGE MRID',
         'RESOURCE NAME',
@@ -29,6 +33,20 @@ class CurtailmentReportDownloader:
         'MKTORGANIZATION MRID',
         'BAA'
     ]
+    datetime_column_names = [
+        'CURTAILMENT START DATE TIME',
+        'CURTAILMENT END DATE TIME'
+    ]
+    numeric_column_names = [
+        'OUTAGE MRID',
+        'CURTAILMENT MW',
+        'RESOURCE PMAX MW',
+        'NET QUALIFYING CAPACITY MW'
+    ]
+    partition_column_names = [
+        'report_year',
+        'report_month'
+    ]
     def __init__(self,config:dict):
         log_dtypes = {
             'effective_date' : 'datetime64[D]',
@@ -40,9 +58,39 @@ class CurtailmentReportDownloader:
         log_path = Path(config['caiso_curtailment_reports']['download_log_path'])
 
         self.urls = config['caiso_curtailment_reports']['url']
+
+        # Precompute url template lookups for exceptional dates, mapping each
+        # listed date to the position of the first exception listing it and
+        # holding the bounds of range exceptions in arrays, so that the first
+        # matching exception in config order is selected for each date:
+        self.exception_templates = [e['template'] for e in self.urls['exceptions']]
+        self.exception_positions = {}
+        for position,e in enumerate(self.urls['exceptions']):
+            if e['type']=='list':
+                for date in e['dates']:
+                    self.exception_positions.setdefault(date,position)
+        self.exception_range_positions = np.array(
+            [position for position,e in enumerate(self.urls['exceptions']) if e['type']=='range'],
+            dtype=int
+        )
+        range_exceptions = [self.urls['exceptions'][position] for position in self.exception_range_positions]
+        self.exception_range_starts = pd.to_datetime([e['dates'][0] for e in range_exceptions]).to_numpy()
+        self.exception_range_ends = pd.to_datetime([e['dates'][1] for e in range_exceptions]).to_numpy()
         self.download_path_template = config['caiso_curtailment_reports']['download_path_template']
+
+        # Header row positions and column mappings seen in previously read
+        # reports, which are stable across most report templates:
+        self.header_row_numbers = []
+        self.column_indices = {}
         self.combined_reports_path = Path(config['caiso_curtailment_reports']['combined_reports_path'])
         self.logger = DataLogger(dtypes=log_dtypes,log_path=log_path,delimiter=',')
+
+        # Map the effective date of each logged download to its log timestamp
+        # for constant-time checks against previously downloaded reports:
+        self.download_timestamps = dict(zip(
+            self.logger.data.loc[:,'effective_date'],
+            self.logger.data.loc[:,'log_timestamp']
+        ))
         self.status_logger = TextLogger(
             cli_logging_criticalities=['INFORMATION','WARNING','ERROR'],
             file_logging_criticalities=['WARNING','ERROR'],
@@ -61,19 +109,39 @@ class CurtailmentReportDownloader:
         Returns:
             A string url pointing to a report if it exists for the given day.
         '''
-        
-        # Retrieve the standard or exceptional url template from config file:
-        for e in self.urls['exceptions']:
-            if (e['type']=='list' and date in e['dates']) or \
-                (e['type']=='range' and
-                    date>=e['dates'][0] and date<=e['dates'][1]):
-                date_template = e['template']
-                break
-        else:
-            date_template = self.urls['standard']
-        
-        # Apply the input date for the selected template to return full url:
-        return date.strftime(date_template)
+        return self.urls_by_dates([date])[0]
+
+    def urls_by_dates(self,dates:list):
+        '''
+        Generates the urls for CAISO prior trade day curtailment reports for a
+        list of dates at once, selecting standard or exceptional url templates
+        by comparing all dates against the precomputed exception ranges at once.
+
+        Parameters:
+            dates - a list of date objects representing single days.
+
+        Returns:
+            A list of string urls corresponding to the input dates.
+        '''
+        # Find the position of the first range exception containing each date,
+        # or the number of exceptions if no range contains it:
+        no_exception = len(self.exception_templates)
+        timestamps = pd.to_datetime(dates).to_numpy()[:,np.newaxis]
+        in_range = (timestamps>=self.exception_range_starts) & (timestamps<=self.exception_range_ends)
+        range_positions = np.where(in_range,self.exception_range_positions,no_exception).min(axis=1,initial=no_exception)
+        urls = []
+        for date,range_position in zip(dates,range_positions):
+            # Retrieve the standard or exceptional url template from config
+            # file, taking the first exception listing or containing the date:
+            position = min(self.exception_positions.get(date,no_exception),range_position)
+            if position<no_exception:
+                date_template = self.exception_templates[position]
+            else:
+                date_template = self.urls['standard']
+
+            # Apply the input date for the selected template to return full url:
+            urls.append(date.strftime(date_template))
+        return urls
 
     def download_path_by_date(self,effective_date:d):
         '''
@@ -108,31 +176,149 @@ class CurtailmentReportDownloader:
                 0 if file is already downloaded according to log
                 200 if file successfully downloaded and saved to location
         '''
-        if (ts(effective_date)==self.logger.data.loc[:,'effective_date']).any():
-            download_date = self.logger.data.loc[(self.logger.data.loc[:,'effective_date']==ts(effective_date)),'log_timestamp'].iloc[0]
+        if ts(effective_date) in self.download_timestamps:
+            download_date = self.download_timestamps[ts(effective_date)]
             self.status_logger.log('Skipping Download for {} [Already downloaded {}]'.format(effective_date.strftime('%Y-%m-%d'),download_date.strftime('%Y-%m-%d %H:%M:%S')))
             return 0
         else:
-            url = self.url_by_date(effective_date)
-            download_path = self.download_path_by_date(effective_date)
-            with download_path.open('wb') as f:
-                c = pycurl.Curl()
-                c.setopt(c.URL,url)
-                c.setopt(c.FOLLOWLOCATION,True)
-                c.setopt(c.WRITEDATA,f)
-                c.perform()
-                response_code = c.getinfo(c.RESPONSE_CODE)
-                c.close()
-                self.logger.log(pd.Series({
-                    'effective_date' : effective_date,
-                    'source_url' : url,
-                    'download_path' : download_path,
-                    'loaded_to_parquet' : 0,
-                }))
-                self.logger.commit()
-            self.status_logger.log('Downloading for {}: {}'.format(effective_date.strftime('%Y-%m-%d'),url))
+            response_code,_ = self.fetch_report_by_date(effective_date)
             return response_code
 
+    def fetch_report_by_date(self,effective_date:d):
+        '''
+        Downloads a prior trade day curtailments report from the CAISO website
+        into memory, then saves it to its download path.
+
+        Parameters:
+            date - a date object representing a given day
+
+        Side Effects:
+            Saves an Excel spreadsheet file.
+            Prints actions to console
+            Appends the download log
+
+        Returns:
+            A tuple containing the response code from the CAISO website and a
+            BytesIO object containing the downloaded report, positioned at
+            its start.
+        '''
+        url = self.url_by_date(effective_date)
+        download_path = self.download_path_by_date(effective_date)
+        report = io.BytesIO()
+        c = pycurl.Curl()
+        c.setopt(c.URL,url)
+        c.setopt(c.FOLLOWLOCATION,True)
+        c.setopt(c.WRITEDATA,report)
+        c.perform()
+        response_code = c.getinfo(c.RESPONSE_CODE)
+        c.close()
+        download_path.write_bytes(report.getbuffer())
+        report.seek(0)
+        self.logger.log(pd.Series({
+            'effective_date' : effective_date,
+            'source_url' : url,
+            'download_path' : download_path,
+            'loaded_to_parquet' : 0,
+        }))
+        self.logger.commit()
+        self.download_timestamps[ts(effective_date)] = self.logger.data.loc[:,'log_timestamp'].iloc[-1]
+        self.status_logger.log('Downloading for {}: {}'.format(effective_date.strftime('%Y-%m-%d'),url))
+        return response_code,report
+
+    def download_reports_by_dates(self,effective_dates:list):
+        '''
+        Downloads prior trade day curtailment reports from the CAISO website for
+        a list of dates concurrently, driving a pool of reusable curl handles
+        through a single curl multi handle.
+
+        Parameters:
+            effective_dates - a list of date objects representing the days for
+                which reports should be downloaded
+
+        Side Effects:
+            Downloads and saves Excel spreadsheet files.
+            Prints actions to console
+            Appends the download log and commits it once all downloads finish
+
+        Returns:
+            A dict mapping each input date to the response code from the CAISO
+            website, or -1 if the transfer failed.
+        '''
+        queue = list(reversed(effective_dates))
+        multi = pycurl.CurlMulti()
+        handles = []
+        for _ in range(min(self.max_concurrent_downloads,len(queue))):
+            c = pycurl.Curl()
+            c.setopt(c.FOLLOWLOCATION,True)
+            c.setopt(c.TCP_KEEPALIVE,1)
+            c.setopt(c.SSL_SESSIONID_CACHE,1)
+            c.setopt(c.ACCEPT_ENCODING,'')
+            handles.append(c)
+        free_handles = list(handles)
+        urls = dict(zip(effective_dates,self.urls_by_dates(effective_dates)))
+        response_codes = {}
+        log_entries = []
+
+        def finish(c,response_code):
+            c.f.close()
+            multi.remove_handle(c)
+            response_codes[c.effective_date] = response_code
+            if response_code==200:
+                log_entries.append({
+                    'effective_date' : c.effective_date,
+                    'source_url' : c.url,
+                    'download_path' : str(c.download_path),
+                    'loaded_to_parquet' : 0,
+                })
+                self.status_logger.log('Downloading for {}: {}'.format(c.effective_date.strftime('%Y-%m-%d'),c.url))
+            else:
+                c.download_path.unlink()
+            free_handles.append(c)
+
+        while len(queue)>0 or len(free_handles)<len(handles):
+            # Assign pending dates to any idle handles:
+            while len(queue)>0 and len(free_handles)>0:
+                c = free_handles.pop()
+                c.effective_date = queue.pop()
+                c.url = urls[c.effective_date]
+                c.download_path = self.download_path_by_date(c.effective_date)
+                c.f = c.download_path.open('wb')
+                c.setopt(c.URL,c.url)
+                c.setopt(c.WRITEDATA,c.f)
+                multi.add_handle(c)
+
+            # Advance all active transfers:
+            while True:
+                ret,_ = multi.perform()
+                if ret!=pycurl.E_CALL_MULTI_PERFORM:
+                    break
+
+            # Collect completed transfers and release their handles:
+            while True:
+                queued,succeeded,failed = multi.info_read()
+                for c in succeeded:
+                    finish(c,c.getinfo(c.RESPONSE_CODE))
+                for c,_,error_message in failed:
+                    self.status_logger.log(
+                        'Download failed for {}: {}'.format(c.effective_date.strftime('%Y-%m-%d'),error_message),
+                        criticality='WARNING'
+                    )
+                    finish(c,-1)
+                if queued==0:
+                    break
+            multi.select(1.0)
+
+        for c in handles:
+            c.close()
+        multi.close()
+
+        if len(log_entries)>0:
+            self.logger.log_batch(pd.DataFrame(log_entries))
+            self.logger.commit()
+            log_timestamp = self.logger.data.loc[:,'log_timestamp'].iloc[-1]
+            self.download_timestamps.update({ts(entry['effective_date']):log_timestamp for entry in log_entries})
+        return response_codes
+
     def download_all_reports(self):
         '''
         Downloads all prior trade day curtailments report from the CAISO website,
@@ -142,7 +328,7 @@ class CurtailmentReportDownloader:
             None
 
         Side Effects:
-            Calls download_report_by_date method.
+            Calls download_reports_by_dates method.
 
         Returns:
             None
@@ -152,17 +338,12 @@ class CurtailmentReportDownloader:
             d.fromordinal(x) for x in \
             range(self.start_date.toordinal(),today.toordinal())
         ]
-        download_count = 0
-        skip_count = 0
-        error_dates = []
-        for date in date_range:
-            result = self.download_report_by_date(date)
-            if result==200:
-                download_count += 1
-            elif result<0:
-                skip_count += 1
-            else:
-                error_dates.append(date)
+        pending_dates = [date for date in date_range if ts(date) not in self.download_timestamps]
+        skip_count = len(date_range) - len(pending_dates)
+        with self.logger.batched():
+            response_codes = self.download_reports_by_dates(pending_dates)
+        download_count = sum(1 for result in response_codes.values() if result==200)
+        error_dates = [date for date,result in response_codes.items() if result!=200]
         if download_count>1:
             self.status_logger.log(f'Downloaded {download_count} new reports.')
         elif download_count>0:
@@ -176,12 +357,11 @@ class CurtailmentReportDownloader:
         else:
             self.status_logger.log('No reports skipped')
         if len(error_dates)>1:
-            for error_date in error_dates:
-                self.status_logger.log(
-                    'Unable to download reports for the following dates: ' + \
-                    ', '.join([error_date.strftime('%Y-%m-%d') for error_date in error_dates]),
-                    criticality='WARNING'
-                )
+            self.status_logger.log(
+                'Unable to download reports for the following dates: ' + \
+                ', '.join([error_date.strftime('%Y-%m-%d') for error_date in sorted(error_dates)]),
+                criticality='WARNING'
+            )
         elif len(error_dates)>0:
             self.status_logger.log(
                 'Unable to download report for the following date: '
@@ -191,30 +371,138 @@ class CurtailmentReportDownloader:
 
     def load_parquet(self):
         '''
-        Loads data from a saved parquet file to reduce time reading from excel
-        files
+        Loads data from the saved parquet dataset, or a single parquet file
+        saved by earlier versions, to reduce time reading from excel files
         '''
-        if self.combined_reports_path.is_file():
-            return pd.read_parquet(self.combined_reports_path)
+        if self.combined_reports_path.exists():
+            return pd.read_parquet(self.combined_reports_path).drop(
+                columns=self.partition_column_names,
+                errors='ignore'
+            )
         else:
             return pd.DataFrame(columns=['REPORT DATE']+self.column_names)
 
+    def append_parquet(self,df:pd.DataFrame,dataset_path:Path=None):
+        '''
+        Appends curtailment reports to the parquet dataset at the path
+        specified in the config dictionary, partitioned by year and month of
+        the report date so that only new files are written.
+
+        Parameters:
+            df - DataFrame with a 'REPORT DATE' column and the columns listed
+                in the column_names class variable
+            dataset_path - optional path to a dataset directory to append to
+                in place of the combined reports path
+        '''
+        # Apply consistent column types so files written from different
+        # reports share a single schema:
+        df = df.astype({k:'string' for k in self.column_names \
+            if k not in self.datetime_column_names+self.numeric_column_names})
+        for k in self.datetime_column_names:
+            df[k] = pd.to_datetime(df.loc[:,k])
+        for k in self.numeric_column_names:
+            df[k] = pd.to_numeric(df.loc[:,k])
+        df['REPORT DATE'] = pd.to_datetime(df.loc[:,'REPORT DATE'])
+        df['report_year'] = df.loc[:,'REPORT DATE'].dt.year
+        df['report_month'] = df.loc[:,'REPORT DATE'].dt.month
+        if dataset_path is None:
+            dataset_path = self.combined_reports_path
+        append_parquet_dataset(df,dataset_path,self.partition_column_names)
+
     def dump_parquet(self):
         '''
-        Saves the current dataframe of curtailment reports to a parquet file at
-        the path specified in the config dictionary
+        Saves the current dataframe of curtailment reports to a parquet dataset
+        at the path specified in the config dictionary, replacing any existing
+        dataset
+        '''
+        self.replace_parquet(self.curtailment_data)
+
+    def replace_parquet(self,df:pd.DataFrame):
+        '''
+        Writes curtailment reports to a new parquet dataset in a temporary
+        directory next to the combined reports path, then swaps it in place of
+        the existing dataset or file so that the existing data is kept if the
+        write fails.
+
+        Parameters:
+            df - DataFrame with a 'REPORT DATE' column and the columns listed
+                in the column_names class variable
         '''
-        self.curtailment_data.to_parquet(self.combined_reports_path)
+        temporary_path = self.combined_reports_path.with_name(self.combined_reports_path.name+'.part')
+        if temporary_path.exists():
+            shutil.rmtree(temporary_path)
+        self.append_parquet(df,temporary_path)
+        self.remove_parquet()
+        temporary_path.replace(self.combined_reports_path)
+
+    def remove_parquet(self):
+        '''
+        Deletes the parquet dataset directory, or a single parquet file saved
+        by earlier versions, containing combined curtailment reports
+        '''
+        if self.combined_reports_path.is_dir():
+            shutil.rmtree(self.combined_reports_path)
+        else:
+            self.combined_reports_path.unlink(missing_ok=True)
     
     def clear_parquet(self):
         '''
-        Deletes the parquet file containing combined curtailment reports and
+        Deletes the parquet dataset containing combined curtailment reports and
         sets the value of the 'loaded_to_parquet' column in the log to 0 for all
         downloaded reports
         '''
-        self.logger.data.loc[:,'loaded_to_parquet'] = 0
+        self.logger.update(slice(None),'loaded_to_parquet',0)
         self.logger.commit()
-        self.combined_reports_path.unlink()
+        self.remove_parquet()
+
+    def read_report(self,report):
+        '''
+        Reads the outage table from the PREV_DAY_OUTAGES worksheet of a prior
+        trade-day curtailment report workbook.
+
+        Parameters:
+            report - a Path object pointing to a downloaded report, or a
+                file-like object containing a report held in memory
+
+        Returns:
+            DataFrame with the columns listed in the column_names class
+            variable, with any columns missing from the report left empty, or
+            None if no header row is found within the first 100 rows.
+        '''
+        # import the workbook reader here so download-only runs don't load it:
+        from python_calamine import CalamineWorkbook
+
+        if isinstance(report,Path):
+            report = str(report)
+        rows = CalamineWorkbook.from_object(report).get_sheet_by_name('PREV_DAY_OUTAGES').to_python()
+
+        # check header row positions found in previous reports before falling
+        # back to finding the header row based on text matching:
+        for header_row_number in self.header_row_numbers:
+            if header_row_number<len(rows) and self.column_names[0] in rows[header_row_number]:
+                break
+        else:
+            for header_row_number,header_row in enumerate(rows[:100]):
+                if self.column_names[0] in header_row:
+                    self.header_row_numbers.append(header_row_number)
+                    break
+            else:
+                return None
+        header_row = tuple(rows[header_row_number])
+
+        # map report columns to column_names once per distinct header:
+        if header_row not in self.column_indices:
+            self.column_indices[header_row] = {
+                k: header_row.index(k) for k in self.column_names if k in header_row
+            }
+        column_indices = self.column_indices[header_row]
+
+        data = pd.DataFrame(rows[header_row_number+1:],columns=range(len(header_row)))
+        data = data.where(data!='',None)
+        return pd.DataFrame({
+            k: data.loc[:,column_indices[k]] if k in column_indices else None \
+            for k in self.column_names
+        })
 
     def extract_report_by_date(self,effective_date:d):
         '''
@@ -229,66 +517,49 @@ class CurtailmentReportDownloader:
             DataFrame containing contents of the selected prior trade-day
             curtailment report.
         '''
-        if (ts(effective_date)!=self.logger.data.loc[:,'effective_date']).all():
-            self.download_report_by_date(effective_date)
-
-        df = pd.DataFrame(columns=self.column_names)
         download_path = Path(self.download_path_by_date(effective_date))
-        
-        # open downloaded report workbook:
-        with download_path.open('rb') as f:
-            self.status_logger.log('Reading ' + download_path.name)
-            in_mem_file = io.BytesIO(f.read())
-            wb = load_workbook(in_mem_file,data_only=True,read_only=True)
-        ws = wb['PREV_DAY_OUTAGES']
-        new_data = {k:[] for k in self.column_names}
-
-        # find header row based on text matching:
-        header_row_number = 1
-        while True:
-            header_row = list(map(lambda x:x.value,ws[header_row_number]))
-            if self.column_names[0] in header_row or header_row_number>100:
-                break
-            else:
-                header_row_number += 1
-
-        columns = {k: header_row.index(k) if k in header_row else None for k in self.column_names}
-        if header_row_number<100:
-            for data_range_row in ws.iter_rows(min_row=header_row_number+1):
-                if len(data_range_row)>0:
-                    for column_name,column_number in columns.items():
-                        if column_number is not None:
-                            new_data[column_name].append(data_range_row[column_number].value)
-                        else:
-                            new_data[column_name].append(None)
-            new_dataframe = pd.DataFrame(new_data)
-
-            # Constrain curtailment hours within trade day:
-            # new_dataframe.loc[:,'CURTAILMENT START DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT START DATE TIME'].apply(lambda t: max(t,ts(effective_date)))
-            # new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].fillna(effective_date+td(days=1))
-            # new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].apply(lambda t: min(t,ts(effective_date)))
-
-            # Append new data to dataframe:
-            df = df.append(new_dataframe,ignore_index=True)
-        return df
+        self.status_logger.log('Reading ' + download_path.name)
+        if ts(effective_date) not in self.download_timestamps:
+            # Read newly downloaded reports from memory rather than reading
+            # them back from disk:
+            _,report = self.fetch_report_by_date(effective_date)
+            new_dataframe = self.read_report(report)
+        else:
+            new_dataframe = self.read_report(download_path)
+        if new_dataframe is None:
+            return pd.DataFrame(columns=self.column_names)
+
+        # Constrain curtailment hours within trade day:
+        # new_dataframe.loc[:,'CURTAILMENT START DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT START DATE TIME'].apply(lambda t: max(t,ts(effective_date)))
+        # new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].fillna(effective_date+td(days=1))
+        # new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].apply(lambda t: min(t,ts(effective_date)))
+
+        return new_dataframe
     
     def update_parquet(self):
         '''
-        Loads data from the combined reports parquet file, then extracts any
-        downloaded reports not already loaded and saves the updated DataFrame
-        to the parquet file.
-        '''
-        df = self.load_parquet()
-        unloaded_reports = self.logger.data.loc[(self.logger.data.loc[:,'loaded_to_parquet']==0),:]
-        for _,r in unloaded_reports.iterrows():
-            new_data = self.extract_report_by_date(r.loc['effective_date'].date())
-            columns = new_data.columns
-            new_data.loc[:,'REPORT DATE'] = r.loc['effective_date']
-            new_data.loc[:,['REPORT DATE']+list(columns)]
-            df = pd.concat([df,new_data],ignore_index=True)
-            self.logger.data.loc[self.logger.data.loc[:,'effective_date']==r.loc['effective_date'],'loaded_to_parquet'] = 1
-        df.to_parquet(self.combined_reports_path)
-        self.logger.commit()
+        Extracts any downloaded reports not already loaded and appends them to
+        the combined reports parquet dataset. A combined reports file saved by
+        earlier versions is converted to a dataset along the way.
+        '''
+        with self.logger.batched():
+            frames = []
+            unloaded_index = self.logger.data.index[self.logger.data.loc[:,'loaded_to_parquet']==0]
+            for effective_date in self.logger.data.loc[unloaded_index,'effective_date']:
+                new_data = self.extract_report_by_date(effective_date.date())
+                new_data.insert(0,'REPORT DATE',effective_date)
+                frames.append(new_data)
+            if self.combined_reports_path.is_file():
+                # Rewrite the earlier combined reports file together with the
+                # new reports, replacing the file only once all reports have
+                # been extracted and written:
+                frames.insert(0,self.load_parquet())
+                self.replace_parquet(pd.concat(frames,ignore_index=True))
+            elif len(frames)>0:
+                self.append_parquet(pd.concat(frames,ignore_index=True))
+
+            # Flag all newly extracted reports as loaded in a single assignment:
+            self.logger.update(unloaded_index,'loaded_to_parquet',1)
 
     def extract_all_reports(self,effective_dates:list=[]):
         '''
@@ -303,45 +574,29 @@ class CurtailmentReportDownloader:
             Dataframe containing data from curtailment reports matching
             the given effective dates.
         '''
-        df = pd.DataFrame(columns=self.column_names)
+        frames = [pd.DataFrame(columns=self.column_names)]
         if len(effective_dates)>0:
-            download_path_strs = list(self.logger.data.loc[self.logger.data.loc[:,'effective_date'].apply(lambda t: t in effective_dates),'download_path'])
+            reports = self.logger.data.loc[self.logger.data.loc[:,'effective_date'].isin(pd.to_datetime(effective_dates)),:]
         else:
-            download_path_strs = list(self.logger.data.loc[:,'download_path'])
-        for effective_date,download_path_str in zip(effective_dates,download_path_strs):
-            with Path(download_path_str).open('rb') as f:
-                self.status_logger.log('Reading '+Path(download_path_str).name)
-                in_mem_file = io.BytesIO(f.read())
-                wb = load_workbook(in_mem_file,data_only=True,read_only=True)
-            ws = wb['PREV_DAY_OUTAGES']
-            new_data = {k:[] for k in self.column_names}
-            # find header row:
-            header_row_number = 1
-            while True:
-                header_row = list(map(lambda x:x.value,ws[header_row_number]))
-                if self.column_names[0] in header_row or header_row_number>100:
-                    break
-                else:
-                    header_row_number += 1
-
-            columns = {k: header_row.index(k) if k in header_row else None for k in self.column_names}
-            if header_row_number<100:
-                for data_range_row in ws.iter_rows(min_row=header_row_number+1):
-                    if len(data_range_row)>0:
-                        for column_name,column_number in columns.items():
-                            if column_number is not None:
-                                new_data[column_name].append(data_range_row[column_number].value)
-                            else:
-                                new_data[column_name].append(None)
-                new_dataframe = pd.DataFrame(new_data)
-                # Constrain curtailment hours within trade day:
-                new_dataframe.loc[:,'CURTAILMENT START DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT START DATE TIME'].apply(lambda t: max(t,effective_date))
-                new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].fillna(effective_date+td(days=1))
-                new_dataframe.loc[:,'CURTAILMENT END DATE TIME'] = new_dataframe.loc[:,'CURTAILMENT END DATE TIME'].apply(lambda t: min(t,effective_date))
-                df = df.append(new_dataframe,ignore_index=True)
+            reports = self.logger.data
+        for effective_date,download_path_str in zip(reports.loc[:,'effective_date'],reports.loc[:,'download_path']):
+            self.status_logger.log('Reading '+Path(download_path_str).name)
+            new_dataframe = self.read_report(Path(download_path_str))
+            if new_dataframe is not None:
+                # Constrain curtailment hours within trade day, treating open-
+                # ended curtailments as lasting through the end of the day:
+                start_of_day = ts(effective_date)
+                end_of_day = start_of_day + td(days=1)
+                new_dataframe['CURTAILMENT START DATE TIME'] = pd.to_datetime(
+                    new_dataframe.loc[:,'CURTAILMENT START DATE TIME']
+                ).clip(lower=start_of_day)
+                new_dataframe['CURTAILMENT END DATE TIME'] = pd.to_datetime(
+                    new_dataframe.loc[:,'CURTAILMENT END DATE TIME']
+                ).fillna(end_of_day).clip(upper=end_of_day)
+                frames.append(new_dataframe)
             else:
                 pass
-        return df
+        return pd.concat(frames,ignore_index=True)
     
     def clear_all_downloads(self):
         '''
@@ -350,7 +605,9 @@ class CurtailmentReportDownloader:
         download log.
         '''
         download_dir = Path(d.today().strftime(self.download_path_template)).parent
-        for p in download_dir.iterdir():
-            p.unlink()
+        with os.scandir(download_dir) as entries:
+            for entry in entries:
+                os.unlink(entry.path)
         self.logger.clear_log()
-        self.logger.commit()
\ No newline at end of file
+        self.logger.commit()
+        self.download_timestamps.clear()
\ No newline at end of file
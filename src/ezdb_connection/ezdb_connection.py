@@ -30,10 +30,47 @@ class EZBDConnection:
             host=self.pguser['host']
         )
 
-    def execute_query(self,sql_str:str):
-        with self.conn.cursor() as curs:
-            curs.execute(sql_str)
+    def execute_query(self,sql_str:str,params=None,server_side:bool=True,batch_size:int=100_000,date_columns:list=[]):
+        '''
+        Executes a query and returns the results as a pandas dataframe.
+
+        parameters:
+            sql_str - a string containing the query to execute
+            params - an optional sequence or dict of values to bind to the
+                query's placeholders, passed through to psycopg2
+            server_side - a boolean indicating whether results should be
+                streamed from a server-side (named) cursor; must be False for
+                strings containing multiple statements, such as PREPARE and
+                EXECUTE pairs
+            batch_size - the number of rows to transfer from the server and
+                convert to a dataframe at a time
+            date_columns - a list of date or timestamp columns to convert to
+                datetime64 as each batch is converted, rather than leaving
+                them as python date objects
+
+        returns:
+            a pandas dataframe containing the query results
+        '''
+        if server_side:
+            curs = self.conn.cursor(name='ezdb_query')
+            curs.itersize = batch_size
+        else:
+            curs = self.conn.cursor()
+        with curs:
+            curs.execute(sql_str,params)
+            # Convert each batch of rows to a dataframe as it arrives so only a
+            # single batch of row tuples is held in memory at a time:
+            batches = []
+            rows = curs.fetchmany(batch_size)
             column_names = [x[0] for x in curs.description]
-            results = pd.DataFrame(curs.fetchall(),columns=column_names)
+            while len(rows)>0:
+                batch = pd.DataFrame.from_records(rows,columns=column_names)
+                for date_column in date_columns:
+                    batch[date_column] = pd.to_datetime(batch.loc[:,date_column])
+                batches.append(batch)
+                rows = curs.fetchmany(batch_size)
+        if len(batches)>0:
+            results = pd.concat(batches,ignore_index=True)
+        else:
+            results = pd.DataFrame(columns=column_names).astype({c:'datetime64[ns]' for c in date_columns})
         return results
-    
\ No newline at end of file
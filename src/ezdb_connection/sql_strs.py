@@ -1,82 +1,90 @@
 from datetime import datetime as dt
+from functools import lru_cache
 
+# Quoted, comma-separated list of columns selected from the economic bid table:
+economic_bid_columns_str = (
+    '"ResID",'
+    '"UNIT_TYPE",'
+    '"DateTime",'
+    '"RTM_DISPATCH_QUANTITY",'
+    '"RTM_DISPATCH_PRICE",'
+    '"RTM_BID_QUANTITY",'
+    '"RTM_BID_PRICE",'
+    '"DAM_DISPATCH_QUANTITY",'
+    '"DAM_DISPATCH_PRICE",'
+    '"DAM_BID_QUANTITY",'
+    '"DAM_BID_PRICE",'
+    '"DAM_SELFSCHEDMW",'
+    '"RUC_DISPATCH_QUANTITY"'
+)
+
+# Filters which may be applied to the economic bid query, each with a bit flag,
+# the condition applied to the query, and the corresponding parameter of
+# get_economic_bid:
+economic_bid_filters = [
+    (0b100,'"ResID"','=','resource_id'),
+    (0b010,'"DateTime"','>=','start_datetime'),
+    (0b001,'"DateTime"','<','end_datetime'),
+]
+
+# Skeleton of the economic bid query, with placeholders for the selected
+# columns and the filter clause:
+economic_bid_query = '''
+            SELECT {columns}
+            FROM caisobiddingdata{where}'''
+economic_bid_where = '''
+            WHERE {conditions}'''
+
+def build_economic_bid_template(key:int):
+    '''
+    Builds the parameterized economic bid query for a combination of filters.
+
+        parameters:
+            key - an integer combining the bit flags of the filters to apply
+
+        returns:
+            a string containing the query, with a placeholder for the value of
+            each filter to be bound by the database driver
+    '''
+    conditions = [f'{column}{operator}%s' for bit,column,operator,_ in economic_bid_filters if key & bit]
+    where_str = economic_bid_where.format(conditions=' AND '.join(conditions)) if len(conditions)>0 else ''
+    return economic_bid_query.format(columns=economic_bid_columns_str,where=where_str)
+
+# Economic bid query templates for each combination of filters:
+economic_bid_templates = {key:build_economic_bid_template(key) for key in range(8)}
+
+@lru_cache(maxsize=256)
 def get_economic_bid(start_datetime:dt=None,end_datetime:dt=None,resource_id:str=None):
-    columns = [
-        'ResID',
-        'UNIT_TYPE',
-        'DateTime',
-        'RTM_DISPATCH_QUANTITY',
-        'RTM_DISPATCH_PRICE',
-        'RTM_BID_QUANTITY',
-        'RTM_BID_PRICE',
-        'DAM_DISPATCH_QUANTITY',
-        'DAM_DISPATCH_PRICE',
-        'DAM_BID_QUANTITY',
-        'DAM_BID_PRICE',
-        'DAM_SELFSCHEDMW',
-        'RUC_DISPATCH_QUANTITY'
-    ]
-    columns_str = ','.join([f'"{c}"' for c in columns])
-    if resource_id is not None:
-        if start_datetime is not None and end_datetime is not None:
-            start_datetime_str = start_datetime.isoformat()
-            end_datetime_str = end_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "ResID"=$1 AND "DateTime">=$2 AND "DateTime"<$3;
-            EXECUTE economic_bid('{resource_id}','{start_datetime}','{end_datetime}');'''
-        elif start_datetime is not None:
-            start_datetime_str = start_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "ResID"=$1 AND "DateTime">=$2;
-            EXECUTE economic_bid('{resource_id}','{start_datetime}');'''
-        elif end_datetime is not None:
-            end_datetime_str = end_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "ResID"=$1 AND "DateTime"<$2;
-            EXECUTE economic_bid('{resource_id}','{end_datetime}');'''
-        else:
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "ResID"=$1;
-            EXECUTE economic_bid('{resource_id}');'''
-    else:
-        if start_datetime is not None and end_datetime is not None:
-            start_datetime_str = start_datetime.isoformat()
-            end_datetime_str = end_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "DateTime">=$1 AND "DateTime"<$2;
-            EXECUTE economic_bid('{start_datetime}','{end_datetime}');'''
-        elif start_datetime is not None:
-            start_datetime_str = start_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "DateTime">=$1;
-            EXECUTE economic_bid('{start_datetime}');'''
-        elif end_datetime is not None:
-            end_datetime_str = end_datetime.isoformat()
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "DateTime"<$1;
-            EXECUTE economic_bid('{end_datetime}');'''
-        else:
-            sql_str = f'''PREPARE economic_bid AS
-            SELECT {columns_str}
-            FROM caisobiddingdata
-            WHERE "DateTime">=$1 AND "DateTime"<$2;
-            EXECUTE economic_bid();'''
-    return sql_str
+    '''
+    Generates a parameterized query for economic bid data, optionally filtered
+    by resource and by a range of datetimes. The query text depends only on
+    which filters are applied, so the database can reuse its plan across
+    calls with different values. Results are cached, so repeated requests for
+    the same bids return the same query and parameters without rebuilding them.
+
+        parameters:
+            start_datetime - a datetime object specifying the earliest bid
+                datetime to include
+            end_datetime - a datetime object specifying the bid datetime before
+                which to stop
+            resource_id - a string containing a single resource id
+
+        returns:
+            a tuple containing the query string and a tuple of parameter values
+            to pass to the database driver along with it
+    '''
+    # Datetimes are converted to ISO strings once here rather than adapted by
+    # the database driver on each execution:
+    values = {
+        'resource_id' : resource_id,
+        'start_datetime' : start_datetime.isoformat() if start_datetime is not None else None,
+        'end_datetime' : end_datetime.isoformat() if end_datetime is not None else None,
+    }
+    key = (resource_id is not None)<<2 | (start_datetime is not None)<<1 | (end_datetime is not None)
+    params = tuple(values[parameter] for bit,_,_,parameter in economic_bid_filters if key & bit)
+    return economic_bid_templates[key],params
 
+@lru_cache(maxsize=None)
 def get_master_capability_list():
     sql_str = '''
         SELECT
@@ -85,6 +93,7 @@ def get_master_capability_list():
     '''
     return sql_str
 
+@lru_cache(maxsize=None)
 def get_master_file():
     sql_str = '''
         SELECT
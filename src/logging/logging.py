@@ -1,13 +1,24 @@
-import re
+import atexit
+import weakref
 import pandas as pd
 from pathlib import Path
-from pandas import Timestamp as ts
-from functools import reduce
+from datetime import datetime
+from contextlib import contextmanager
 
 # 2021-11-04
 # California Public Utilities Commission
 # Robert Hansen, PE
 
+# loggers holding their log files open, tracked by weak reference so that
+# loggers which are no longer used can still be collected; any left open are
+# closed when the interpreter exits:
+open_loggers = weakref.WeakSet()
+
+@atexit.register
+def close_open_loggers():
+    for logger in list(open_loggers):
+        logger.close()
+
 class TextLogger:
     '''
     messages can be logged to either the command line interface, a specified
@@ -49,6 +60,9 @@ class TextLogger:
             file_logging_criticalities - a list of message criticalities which will be logged to file
             log_path - a path object pointing to the file to which logs will be saved
         '''
+        self.log_file = None
+        self.cli_logging_criticalities = 0b000
+        self.file_logging_criticalities = 0b000
         self.set_cli_logging_criticalities(cli_logging_criticalities)
         self.set_file_logging_criticalities(file_logging_criticalities)
         self.set_log_path(log_path)
@@ -63,14 +77,38 @@ class TextLogger:
             criticality - a string indicating the level of criticality for the
                 message, must match one of the keys of the criticalities dict
         '''
-        if criticality in self.criticalities.keys():
-            if self.cli_logging_criticalities & self.criticalities[criticality]:
-                print('{}: {}'.format(criticality,message))
-            if self.file_logging_criticalities & self.criticalities[criticality]:
-                with open(self.log_path,'a') as f:
-                    t = ts.now()
-                    entry = '{}{}{}{}{}\n'.format(t.strftime('%Y-%m-%d %H:%M:%S.%f'),self.delimiter,criticality,self.delimiter,message)
-                    f.write(entry)
+        # return early for messages logged to neither target:
+        bit = self.criticalities.get(criticality,0b000)
+        if not bit & self.logging_criticalities:
+            return
+        if bit & self.cli_logging_criticalities:
+            print(f'{criticality}: {message}')
+        if bit & self.file_logging_criticalities:
+            # keep the log file open between messages, flushing buffered
+            # messages immediately only for errors:
+            if self.log_file is None:
+                self.log_file = self.log_path.open('a',buffering=8192)
+                open_loggers.add(self)
+            t = datetime.now().isoformat(sep=' ',timespec='microseconds')
+            self.log_file.write(f'{t}{self.delimiter}{criticality}{self.delimiter}{message}\n')
+            if criticality=='ERROR':
+                self.log_file.flush()
+
+    def get_criticality_mask(self,criticalities:list):
+        '''
+        combines the bits of a list of criticalities into a single mask.
+
+        parameters:
+            criticalities - a list of strings; any which do not match a key of
+                the criticalities dict are ignored
+
+        returns:
+            an integer with the bit of each listed criticality set
+        '''
+        mask = 0b000
+        for criticality in criticalities:
+            mask |= self.criticalities.get(criticality,0b000)
+        return mask
 
     def set_cli_logging_criticalities(self,criticalities:list):
         '''
@@ -81,7 +119,8 @@ class TextLogger:
             criticalities - a list of strings, each of which must match a key
                 of the criticalities dict
         '''
-        self.cli_logging_criticalities = reduce(lambda a,b:a|b,[self.criticalities[s] if s in self.criticalities.keys() else 0 for s in criticalities],0b000)
+        self.cli_logging_criticalities = self.get_criticality_mask(criticalities)
+        self.logging_criticalities = self.cli_logging_criticalities | self.file_logging_criticalities
 
     def set_file_logging_criticalities(self,criticalities:list):
         '''
@@ -91,7 +130,8 @@ class TextLogger:
             criticalities - a list of strings, each of which must match a key
                 of the criticalities dict
         '''
-        self.file_logging_criticalities = reduce(lambda a,b:a|b,[self.criticalities[s] if s in self.criticalities.keys() else 0 for s in criticalities],0b000)
+        self.file_logging_criticalities = self.get_criticality_mask(criticalities)
+        self.logging_criticalities = self.cli_logging_criticalities | self.file_logging_criticalities
 
     def set_log_path(self,log_path:Path):
         '''
@@ -100,12 +140,14 @@ class TextLogger:
         the first message.
 
         parameters:
-            log_path - path object pointing to a file where log messages will be saved
+            log_path - path object or string pointing to a file where log
+                messages will be saved
         '''
+        self.close()
         try:
-            if not log_path.is_file():
-                with log_path.open(mode='w') as f:
-                    pass
+            log_path = Path(log_path)
+            log_path.parent.mkdir(parents=True,exist_ok=True)
+            log_path.touch(exist_ok=True)
             self.log_path = log_path
         except:
             self.set_file_logging_criticalities([])
@@ -115,9 +157,20 @@ class TextLogger:
         '''
         Purges all data from the consolidation log.
         '''
+        self.close()
         with self.log_path.open('w') as f:
             f.write('')
 
+    def close(self):
+        '''
+        flushes any buffered messages and closes the log file; the file is
+        reopened when the next message is written.
+        '''
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+            open_loggers.discard(self)
+
 class DataLogger:
     '''
     data can be logged to a specified csv file. this class either loads data
@@ -139,8 +192,71 @@ class DataLogger:
             delimiter - delimiter to use when logging data
         '''
         self.dtypes = {column:dtype for column,dtype in [('log_timestamp','datetime64[us]')]+list(dtypes.items())}
+        # date columns take the nearest resolution supported by the installed
+        # version of pandas, e.g., 'datetime64[D]' is stored as seconds or
+        # nanoseconds, so that empty frames and logged rows can be cast to the
+        # same dtypes:
+        for column,dtype in self.dtypes.items():
+            if dtype.startswith('datetime'):
+                self.dtypes[column] = str(pd.Series(dtype=dtype).dtype)
+        # columns are fixed once the logger is created, so the column list and
+        # its split into those parsed as dates and those read with a dtype
+        # when loading the log file are built once here:
+        self.columns = list(self.dtypes.keys())
+        self.parse_dates = []
+        self.read_dtypes = {}
+        for column,dtype in self.dtypes.items():
+            if dtype.startswith('datetime'):
+                self.parse_dates.append(column)
+            else:
+                self.read_dtypes[column] = dtype
+        self.batch_depth = 0
+        self.pending = {}
+        self.pending_rows = 0
+        self.committed_rows = 0
+        self.rewrite_required = True
+        self.log_file = None
         self.set_delimiter(delimiter)
         self.set_log_path(log_path)
+    @property
+    def data(self):
+        '''
+        the log dataframe. rows logged since the dataframe was last accessed
+        are buffered as lists of values by column and appended in a single
+        concatenation here.
+        '''
+        if self.pending_rows>0:
+            pending = pd.DataFrame(self.pending)
+            self.pending = {}
+            self.pending_rows = 0
+            # convert date columns so logged rows can be used as datetimes
+            # before the log is next committed:
+            for column in pending.columns:
+                if column in self.parse_dates:
+                    pending[column] = pd.to_datetime(pending.loc[:,column])
+            self._data = pd.concat([self._data,pending],ignore_index=True)
+        return self._data
+    @data.setter
+    def data(self,data:pd.DataFrame):
+        # replacing the dataframe may change rows already written to file, so
+        # the next commit rewrites the whole file:
+        self.pending = {}
+        self.pending_rows = 0
+        self._data = data
+        self.rewrite_required = True
+    def update(self,index,columns,value):
+        '''
+        sets values in rows already in the log. rows written to file by an
+        earlier commit are only ever appended to, so any change to existing
+        rows must be made here for the next commit to rewrite the file.
+
+        parameters:
+            index - row labels or boolean mask selecting the rows to update
+            columns - a column label or list of column labels to update
+            value - the value or values to assign
+        '''
+        self.data.loc[index,columns] = value
+        self.rewrite_required = True
     def log(self,data:pd.Series):
         '''
         appends a single row of input data to the dataframe.
@@ -148,27 +264,82 @@ class DataLogger:
         parameters:
             data - a pandas series containing data to include in the log
         '''
-        data['log_timestamp'] = ts.now()
-        self.data = self.data.append(data,ignore_index=True)
+        data['log_timestamp'] = datetime.now()
+        self.buffer_rows({column:[value] for column,value in data.items()},1)
+    def log_batch(self,data:pd.DataFrame):
+        '''
+        appends multiple rows of input data to the dataframe at once, sharing a
+        single log timestamp.
+
+        parameters:
+            data - a pandas dataframe containing rows to include in the log
+        '''
+        data = data.assign(log_timestamp=datetime.now())
+        self.buffer_rows({column:data[column].tolist() for column in data.columns},len(data))
+    def buffer_rows(self,columns:dict,row_count:int):
+        '''
+        adds rows to the buffer of rows logged since the dataframe was last
+        accessed, extending the list of values for each column. columns absent
+        from either the buffer or the new rows are filled with None.
+
+        parameters:
+            columns - a dict mapping column names to lists of values, each of
+                length row_count
+            row_count - the number of rows being added
+        '''
+        for column,values in columns.items():
+            self.pending.setdefault(column,[None]*self.pending_rows).extend(values)
+        self.pending_rows += row_count
+        for values in self.pending.values():
+            if len(values)<self.pending_rows:
+                values.extend([None]*(self.pending_rows-len(values)))
+    def empty_data(self):
+        '''
+        builds an empty dataframe with the logger's columns and dtypes.
+
+        returns:
+            a pandas dataframe with no rows
+        '''
+        return pd.DataFrame(columns=self.columns).astype(self.dtypes)
     def load_log(self):
         '''
         checks the log file against the current list of columns and either
-        loads the data or initializes a new dataframe.
+        loads the data or initializes a new dataframe. columns added to the
+        logger since the file was written are filled with default values: empty
+        strings, missing dates, or zeros.
         '''
         if self.log_path.is_file():
-            dtypes = {column:dtype for column,dtype in filter(lambda x: not re.match('datetime.*',x[1]),self.dtypes.items())}
-            parse_dates = list(filter(lambda k: re.match('datetime.*',self.dtypes[k]),self.dtypes.keys()))
-            file_data = pd.read_csv(self.log_path,dtype=dtypes,parse_dates=parse_dates,delimiter=self.delimiter)
-            if all([column in file_data.columns for column in self.dtypes.keys()]):
-                for date_column in parse_dates:
+            file_columns = pd.read_csv(self.log_path,nrows=0,delimiter=self.delimiter).columns
+            if any([column in file_columns for column in self.columns]):
+                file_data = pd.read_csv(
+                    self.log_path,
+                    dtype={k:v for k,v in self.read_dtypes.items() if k in file_columns},
+                    parse_dates=[column for column in self.parse_dates if column in file_columns],
+                    delimiter=self.delimiter
+                )
+                missing_columns = [column for column in self.columns if column not in file_columns]
+                for column in missing_columns:
+                    if self.dtypes[column]=='string':
+                        default_value = ''
+                    elif self.dtypes[column].startswith('datetime'):
+                        default_value = pd.NaT
+                    else:
+                        default_value = 0
+                    file_data[column] = pd.Series(default_value,index=file_data.index).astype(self.dtypes[column])
+                for date_column in self.parse_dates:
                     file_data.loc[:,date_column] = file_data.loc[:,date_column].astype(self.dtypes[date_column])
-                replacement_values = {k:'' for k in filter(lambda k:self.dtypes[k]=='string',self.dtypes.keys())}
+                replacement_values = {k:'' for k in self.columns if self.dtypes[k]=='string'}
                 file_data.fillna(replacement_values,inplace=True)
-                self.data = file_data[self.dtypes.keys()]
+                self.data = file_data[self.columns]
+                # the file already holds the loaded rows, so later commits
+                # only need to append new ones, unless the file is missing
+                # columns and must be rewritten with all of them:
+                self.committed_rows = len(self.data)
+                self.rewrite_required = len(missing_columns)>0
             else:
-                self.data = pd.DataFrame({column:pd.Series(dtype=dtype) for column,dtype in self.dtypes.items()})
+                self.data = self.empty_data()
         else:
-            self.data = pd.DataFrame({column:pd.Series(dtype=dtype) for column,dtype in self.dtypes.items()})
+            self.data = self.empty_data()
     def set_log_path(self,log_path:Path):
         '''
         sets the path of the file to which messages will be logged according to
@@ -178,6 +349,7 @@ class DataLogger:
         parameters:
             log_path - path object pointing to a file where log messages will be saved
         '''
+        self.close()
         self.log_path = log_path
         self.log_path.parent.mkdir(parents=True,exist_ok=True)
         self.load_log()
@@ -195,15 +367,55 @@ class DataLogger:
         '''
         Purges all data from the consolidation log.
         '''
-        self.data = pd.DataFrame(columns=list(self.dtypes.keys()))
-    def commit(self):
+        self.data = self.empty_data()
+    @contextmanager
+    def batched(self):
         '''
-        writes the log dataframe to file.
+        context manager which defers writing the log to file until the end of
+        the block, so that repeated commits within the block result in a single
+        write. the log is written on exit even if the block raises an
+        exception, and nested blocks write only when the outermost exits.
         '''
-        for column,dtype in self.dtypes.items():
-            self.data.loc[:,column] = self.data.loc[:,column].astype(dtype)
-        columns = list(self.dtypes.keys())
-        self.data.loc[:,columns].sort_values('log_timestamp').to_csv(self.log_path,sep=self.delimiter,index=False)
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth==0:
+                self.commit()
+    def commit(self):
+        '''
+        writes the log dataframe to file, unless called within a batched()
+        block, in which case the write is deferred until the block exits.
+        rows logged since the previous commit are appended to the file; the
+        whole file is only rewritten when existing rows may have changed.
+        '''
+        if self.batch_depth>0:
+            return
+        data = self.data.astype(self.dtypes)
+        self._data = data
+        if self.rewrite_required or self.committed_rows==0 or not self.log_path.is_file():
+            self.close()
+            # a stable sort keeps logs already in timestamp order as they are:
+            data.sort_values('log_timestamp',kind='mergesort').loc[:,self.columns].to_csv(self.log_path,sep=self.delimiter,index=False)
+        elif len(data)>self.committed_rows:
+            # keep the file open for appending between commits:
+            if self.log_file is None:
+                self.log_file = self.log_path.open('a',newline='',buffering=8192)
+                open_loggers.add(self)
+            data.iloc[self.committed_rows:,:].sort_values('log_timestamp',kind='mergesort').loc[:,self.columns].to_csv(self.log_file,header=False,sep=self.delimiter,index=False)
+            self.log_file.flush()
+        self.committed_rows = len(data)
+        self.rewrite_required = False
+    def close(self):
+        '''
+        closes the log file if it is held open for appending; it is reopened
+        by the next commit which appends rows.
+        '''
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+            open_loggers.discard(self)
 
 class EmailLogger(DataLogger):
     '''
@@ -232,7 +444,6 @@ class EmailLogger(DataLogger):
             log_path=log_path,
             delimiter=',',
         )
-        self.data.loc[:,'receipt_date'] = self.data.loc[:,'receipt_date']
 
 class AttachmentLogger(DataLogger):
     '''
@@ -265,9 +476,12 @@ class AttachmentLogger(DataLogger):
         '''
         Clears validation data from the attachment log.
         '''
-        self.data.loc[:,'ra_category'] = 'not_validated'
-        self.data.loc[:,['organization_id','archive_path']]=''
-        self.data.loc[:,'effective_date']=None
+        self.data = self.data.assign(
+            ra_category='not_validated',
+            organization_id='',
+            archive_path='',
+            effective_date=pd.NaT,
+        )
         self.commit()
 
 class ConsolidationLogger(DataLogger):
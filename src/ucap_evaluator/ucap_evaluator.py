@@ -1,18 +1,37 @@
 import pandas as pd
 import numpy as np
 import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import date as d,time as t,datetime as dt,timedelta as td
 from src.logging.logging import TextLogger
-from src.utils.datetime_functions import datetime_range_overlap,hour_filter_overlap,select_hours_within_datetime_range,coalesce_hour_filter
-from scripts.retrieve_master_capability_list import retrieve_master_capability_list
-from scripts.retrieve_master_file import retrieve_master_file
+from src.utils.datetime_functions import datetime_range_overlap_batch,hour_filter_overlap_batch,grouped_hour_filter_overlap_batch,select_hours_within_datetime_range,coalesce_hour_filter
 
 class UCAPEvaluator:
     '''
     A class to manage analysis of curtailment data to evaluate UCAP values for
     individual resources.
     '''
+    # Columns of the combined curtailment reports used in the analysis:
+    curtailment_column_names = [
+        'REPORT DATE',
+        'OUTAGE MRID',
+        'RESOURCE ID',
+        'OUTAGE TYPE',
+        'NATURE OF WORK',
+        'CURTAILMENT START DATE TIME',
+        'CURTAILMENT END DATE TIME',
+        'CURTAILMENT MW',
+        'RESOURCE PMAX MW'
+    ]
+    # Columns of repeated labels which are compared and grouped on, stored as
+    # categoricals:
+    categorical_column_names = [
+        'OUTAGE MRID',
+        'RESOURCE ID',
+        'OUTAGE TYPE',
+        'NATURE OF WORK'
+    ]
     def __init__(self,config:dict):
         self.combined_reports_path = Path(config['caiso_curtailment_reports']['combined_reports_path'])
         self.status_logger = TextLogger(
@@ -20,18 +39,25 @@ class UCAPEvaluator:
             file_logging_criticalities=['WARNING','ERROR'],
             log_path=config['ucap_analysis']['text_log_path']
         )
-        self.curtailment_data = pd.read_parquet(self.combined_reports_path)
+        curtailment_data = pd.read_parquet(self.combined_reports_path,engine='pyarrow',columns=self.curtailment_column_names)
+        for column in self.categorical_column_names:
+            curtailment_data[column] = curtailment_data.loc[:,column].astype('category')
         self.natures_of_work = config['ucap_analysis']['natures_of_work']
+        self.curtailment_data = curtailment_data
         self.grid_hour_filter = pd.read_csv(config['ucap_analysis']['hour_filter_path'],parse_dates=[0,1])
         # self.resource_hour_filter = pd.read_parquet(config['demand_hours_analysis']['resource_demand_hours_path'])
 
         master_capability_list_path = Path(config['caiso_master_capability_list']['download_path'])
         if not master_capability_list_path.is_file():
+            # import database retrieval only when needed, since it requires a
+            # database driver and login credentials:
+            from scripts.retrieve_master_capability_list import retrieve_master_capability_list
             retrieve_master_capability_list()
         self.master_capability_list = pd.read_parquet(master_capability_list_path)
 
         master_file_path = Path(config['caiso_master_file']['download_path'])
         if not master_file_path.is_file():
+            from scripts.retrieve_master_file import retrieve_master_file
             retrieve_master_file()
         self.master_file = pd.read_parquet(master_file_path)
     
@@ -48,87 +74,70 @@ class UCAPEvaluator:
                 end_date - a datetime.date object specifying the final date of a
                     range of dates across which to evaluate the EFOR for each
                     resource in the curtailment data
+
+            returns:
+                a pandas dataframe with each resource id and corresponding
+                equivalent forced outage rate within the date range; results
+                are kept for each date range, so repeated calls for the same
+                range return a copy of the earlier result.
         '''
+        if (start_date,end_date) in self.date_range_results:
+            return self.date_range_results[(start_date,end_date)].copy()
+
         start_date_str = start_date.strftime('%Y-%m-%d')
         end_date_str = end_date.strftime('%Y-%m-%d')
         self.status_logger.log(f'Calculating EFOR Within Date Range {start_date_str} to {end_date_str}.',criticality='INFORMATION')
 
-        # Get prepared curtailment data:
-        df = self.prepare_curtailment_data()
+        # Get prepared forced outages:
+        df = self.get_forced_curtailment_data()
+
+        # Bounds of the date range, from the start of the first date to the
+        # end of the last date:
+        start_datetime = pd.Timestamp(dt.combine(start_date,t(0,0,0)))
+        end_datetime = pd.Timestamp(dt.combine(end_date,t(0,0,0)) + td(days=1))
+        range_hours = (end_datetime - start_datetime).total_seconds() / 3600
 
         # Filter curtailment data for reports containing dates within input
-        # range:
+        # range, taking only curtailments starting before the end of the range
+        # from the start-sorted data before checking their ends:
         self.status_logger.log('\tFiltering curtailment reports.',criticality='INFORMATION')
-        df.loc[:,'INCLUDE'] = df.apply(
-            lambda r: \
-            (r.loc['CURTAILMENT START DATE TIME']<dt.combine(end_date,t(0,0,0))+td(days=1)) \
-            and (r.loc['CURTAILMENT END DATE TIME']>=dt.combine(start_date,t(0,0,0))),
-            axis='columns',
-            result_type='expand'
-        )
-        df = df.loc[df.loc[:,'INCLUDE'],:]
-
-        # Filter curtailment data for forced outages and nature-of-work codes
-        # listed in the configuration file:
-        df = df.loc[(df.loc[:,'OUTAGE TYPE']=='FORCED'),:]
-        if self.natures_of_work is not None:
-            df.loc[:,'INCLUDE'] = df.apply(
-                lambda r: r.loc['NATURE OF WORK'] in self.natures_of_work,
-                axis='columns',
-                result_type='expand'
-            )
-            df = df.loc[df.loc[:,'INCLUDE'],:]
-
-        # Get most recent curtailment report for each MRID:
-        current_reports = df.loc[:,[
-            'OUTAGE MRID',
-            'REPORT DATE'
-        ]].groupby('OUTAGE MRID').max().reset_index().apply(
-            lambda r:(r.loc['OUTAGE MRID'],r.loc['REPORT DATE']),
-            axis='columns',
-            result_type='reduce'
-        )
-        df = df.set_index(['OUTAGE MRID','REPORT DATE']).loc[current_reports,:].reset_index()
+        df = df.iloc[:np.searchsorted(df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy(),end_datetime.to_datetime64(),side='left'),:]
+        df = df.loc[df.loc[:,'CURTAILMENT END DATE TIME'].to_numpy()>=start_datetime.to_datetime64(),:]
+
+        # Get most recent curtailment report for each MRID, keeping every time
+        # block reported in it:
+        latest_report_dates = df.groupby('OUTAGE MRID',observed=True,sort=False)['REPORT DATE'].transform('max')
+        df = df.loc[df.loc[:,'REPORT DATE']==latest_report_dates,:]
 
-        # Calculate reported outage hours within date range and selected nature-
-        # of-work codes:
+        # Calculate reported outage hours within date range; all remaining
+        # curtailments already overlap the range:
         self.status_logger.log('\tCalculating outage rates within date range.')
-        df = df.loc[
-            (df.loc[:,'CURTAILMENT START DATE TIME']<=dt.combine(end_date,t(0,0,0))+td(days=1)) \
-            * (df.loc[:,'CURTAILMENT END DATE TIME']>=dt.combine(start_date,t(0,0,0)))
-        ]
-        df.loc[:,'OUTAGE MWH DURING DEMAND'] = df.apply(
-            lambda r:datetime_range_overlap(
-                r.loc['CURTAILMENT START DATE TIME'],
-                r.loc['CURTAILMENT END DATE TIME'],
-                dt.combine(start_date,t(0,0,0)),
-                dt.combine(end_date,t(0,0,0)) + td(days=1)
-            ),
-            axis='columns',
-            result_type='expand'
+        applicable_outage_hours = datetime_range_overlap_batch(
+            df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy(),
+            df.loc[:,'CURTAILMENT END DATE TIME'].to_numpy(),
+            start_datetime,
+            end_datetime
         )
 
-        # Calculate curtailed capacity * duration in MWh
-        df.loc[:,'OUTAGE MWH DURING DEMAND'] = df.loc[:,'CURTAILMENT MW'] \
-            * df.loc[:,'APPLICABLE OUTAGE HOURS']
-
-        # Calculate maximum capacity * time range in MWh
-        df.loc[:,'APPLICABLE PMAX MWH'] = df.loc[:,'RESOURCE PMAX MW'] \
-            * (
-                dt.combine(end_date,t(0,0,0)) + td(days=1)
-                - dt.combine(start_date,t(0,0,0)) \
-            ).total_seconds() / 3600
+        # Calculate curtailed capacity * duration and maximum capacity * time
+        # range in MWh, as new columns alongside only the aggregation keys
+        # rather than written into the filtered slice of the prepared data:
+        df = df.loc[:,['RESOURCE ID','NATURE OF WORK']].assign(**{
+            'APPLICABLE PMAX MWH' : df.loc[:,'RESOURCE PMAX MW'].to_numpy() * range_hours,
+            'OUTAGE MWH DURING DEMAND' : df.loc[:,'CURTAILMENT MW'].to_numpy() * applicable_outage_hours
+        })
         
         # Aggregate by resource id and nature-of-work:
-        df = df.loc[:,['RESOURCE ID','NATURE OF WORK','APPLICABLE PMAX MWH','OUTAGE MWH DURING DEMAND']].groupby(['RESOURCE ID','NATURE OF WORK']).agg({
+        df = df.groupby(['RESOURCE ID','NATURE OF WORK'],observed=True,as_index=False).agg({
             'APPLICABLE PMAX MWH': 'max',
             'OUTAGE MWH DURING DEMAND': 'sum'
-        }).reset_index()
+        })
 
         # Calculate forced outage rate for selected time range as outage MWh/
         # maximum possible MWh:
         df.loc[:,'EQUIVALENT FORCED OUTAGE RATE'] = df.loc[:,'OUTAGE MWH DURING DEMAND'] / df.loc[:,'APPLICABLE PMAX MWH']
-        return df
+        self.date_range_results[(start_date,end_date)] = df
+        return df.copy()
     
     def calculate_equivalent_forced_outage_rate_during_resource_demand_hours(self,resource_hour_filter:list):
         '''
@@ -137,9 +146,10 @@ class UCAPEvaluator:
         level demand hours.
 
             parameters:
-                hour_filter - a pandas dataframe with columns labeled
-                    'RESOURCE ID','DATETIME' and 'INCLUDE' indicating selected
-                    hours, generally expected to constitute a year of hours.
+                resource_hour_filter - a pandas dataframe with columns labeled
+                    'RESOURCE ID','START DATETIME','END DATETIME' and 'INCLUDE'
+                    indicating blocks of selected hours for each resource,
+                    generally expected to constitute a year of hours.
             
             returns:
                 a pandas dataframe with each resource id and corresponding
@@ -148,80 +158,56 @@ class UCAPEvaluator:
         '''
         self.status_logger.log('Calculating EFORd with Individual Resource Demand Period Blocks.',criticality='INFORMATION')
 
-        # Get prepared curtailment data:
-        df = self.prepare_curtailment_data()
+        # Get prepared forced outages:
+        df = self.get_forced_curtailment_data()
 
-        # Breakup resource_hour_filter into separate dataframes for each resource:
-        hour_filter_dict = {k:resource_hour_filter.loc[resource_hour_filter.loc[:,'RESOURCE ID']==k,['START DATETIME','END DATETIME','INCLUDE']] for k in hour_filter.loc[:,'RESOURCE ID'].unique()}
+        # Find the range of demand hours for each resource once, rather than
+        # for each curtailment:
+        resource_ranges = resource_hour_filter.groupby('RESOURCE ID',sort=False).agg({
+            'START DATETIME': 'min',
+            'END DATETIME': 'max'
+        })
 
-        # Filter curtailment data for reports containing dates within input
-        # range:
-        def f(r):
-            resource_id = r.loc['RESOURCE ID']
-            hf = hour_filter_dict[resource_id]
-            start_datetime = hf.loc[:,'START DATETIME'].min().to_pydatetime()
-            end_datetime = hf.loc[:,'END DATETIME'].max().to_pydatetime()
-            return datetime_range_overlap(
-                start_datetime,
-                end_datetime,
-                r.loc['CURTAILMENT START DATE TIME'],
-                r.loc['CURTAILMENT END DATE TIME']
-            )>0
-        df.loc[:,'INCLUDE'] = df.apply(
-            f,
-            axis='columns',
-            result_type='expand'
-        )
-        df = df.loc[df.loc[:,'INCLUDE'],:]
-
-        # Filter curtailment data for forced outages and nature-of-work codes
-        # listed in the configuration file:
-        df = df.loc[(df.loc[:,'OUTAGE TYPE']=='FORCED'),:]
-        if self.natures_of_work is not None:
-            df.loc[:,'INCLUDE'] = df.apply(
-                lambda r: r.loc['NATURE OF WORK'] in self.natures_of_work,
-                axis='columns',
-                result_type='expand'
-            )
-            df = df.loc[df.loc[:,'INCLUDE'],:]
+        # Only resources with demand hours in the hour filter can be evaluated:
+        df = df.loc[df.loc[:,'RESOURCE ID'].isin(resource_ranges.index),:]
 
-        # Calculate reported outage hours within date range and hour filter:
+        # Filter curtailment data for reports overlapping the range of demand
+        # hours of each resource:
+        resource_ids = df.loc[:,'RESOURCE ID'].to_numpy()
         df = df.loc[
-            (df.loc[:,'CURTAILMENT START DATE TIME']<=resource_hour_filter.loc[:,'END DATETIME'].max()) \
-            * (df.loc[:,'CURTAILMENT END DATE TIME']>=resource_hour_filter.loc[:,'START DATETIME'].min()),
+            (df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy()<resource_ranges.loc[resource_ids,'END DATETIME'].to_numpy()) \
+            & (df.loc[:,'CURTAILMENT END DATE TIME'].to_numpy()>resource_ranges.loc[resource_ids,'START DATETIME'].to_numpy()),
             :
         ]
-        def f(r):
-            resource_id = r.loc['RESOURCE ID']
-            hf = hour_filter_dict[resource_id]
-            return hour_filter_overlap(
-                r.loc['CURTAILMENT START DATE TIME'],
-                r.loc['CURTAILMENT END DATE TIME'],
-                hf
-            )
-        df.loc[:,'APPLICABLE OUTAGE HOURS'] = df.apply(
-            f,
-            axis='columns',
-            result_type='expand'
+
+        # Calculate overlap between outages and the demand hours of their
+        # resources for all resources at once:
+        applicable_outage_hours = grouped_hour_filter_overlap_batch(
+            df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy(),
+            df.loc[:,'CURTAILMENT END DATE TIME'].to_numpy(),
+            df.loc[:,'RESOURCE ID'].to_numpy(),
+            resource_hour_filter
         )
 
-        # Calculate curtailed capacity * duration in MWh
+        # Calculate curtailed capacity * duration and maximum capacity * demand
+        # hours of each resource in MWh, as new columns alongside only the
+        # aggregation keys rather than written into the filtered slice of the
+        # prepared data:
         self.status_logger.log('\tCalculating outage rates within hour filter.')
-        df.loc[:,'OUTAGE MWH DURING DEMAND'] = df.loc[:,'CURTAILMENT MW'] \
-            * df.loc[:,'APPLICABLE OUTAGE HOURS']
-
-        # Calculate maximum capacity * time range in MWh
-        df.loc[:,'APPLICABLE PMAX MWH'] = df.loc[:,'RESOURCE PMAX MW'] \
-            * (
-                 hour_filter.loc[:,'END DATETIME'] \
-                - hour_filter.loc[:,'START DATETIME']
-            ).sum().total_seconds() / 3600
+        demand_hours = (
+            resource_hour_filter.loc[:,'END DATETIME'] \
+            - resource_hour_filter.loc[:,'START DATETIME']
+        ).dt.total_seconds().groupby(resource_hour_filter.loc[:,'RESOURCE ID'],sort=False).sum() / 3600
+        df = df.loc[:,['RESOURCE ID','NATURE OF WORK']].assign(**{
+            'APPLICABLE PMAX MWH' : df.loc[:,'RESOURCE PMAX MW'].to_numpy() * df.loc[:,'RESOURCE ID'].map(demand_hours).astype(float).to_numpy(),
+            'OUTAGE MWH DURING DEMAND' : df.loc[:,'CURTAILMENT MW'].to_numpy() * applicable_outage_hours
+        })
         
         # Aggregate by resource id and nature-of-work:
-        df = df.loc[:,['RESOURCE ID','NATURE OF WORK','APPLICABLE PMAX MWH','OUTAGE MWH DURING DEMAND']].groupby(['RESOURCE ID','NATURE OF WORK']).agg({
+        df = df.groupby(['RESOURCE ID','NATURE OF WORK'],observed=True,as_index=False).agg({
             'APPLICABLE PMAX MWH': 'max',
             'OUTAGE MWH DURING DEMAND': 'sum'
-        }).reset_index()
+        })
 
         # Calculate forced outage rate for selected time range as :
         df.loc[:,'EQUIVALENT FORCED OUTAGE RATE DURING DEMAND'] = df.loc[:,'OUTAGE MWH DURING DEMAND'] / df.loc[:,'APPLICABLE PMAX MWH']
@@ -243,39 +229,151 @@ class UCAPEvaluator:
                 equivalent forced outage rate during the demand hours identified
                 in the input hour filter.
         '''
-        block_count = len(shared_hour_filter)
-        self.status_logger.log(f'Calculating EFORd with {block_count} Demand Period Blocks.',criticality='INFORMATION')
+        return self.calculate_equivalent_forced_outage_rates_during_shared_demand_hours({0:shared_hour_filter})[0]
 
-        # Get prepared curtailment data:
-        df = self.prepare_curtailment_data()
+    def calculate_equivalent_forced_outage_rates_during_shared_demand_hours(self,shared_hour_filters:dict):
+        '''
+        Evaluates the forced outage rate during demand periods for each of
+        several sets of shared demand hours, such as each season of each year,
+        in a single pass over the curtailment data: the curtailment data are
+        prepared and filtered once, and only the overlap with each set of
+        demand hours is calculated separately.
 
-        # Remove any curtailment reports without an end date time:
-        df = df.loc[df.loc[:,'CURTAILMENT END DATE TIME'].notnull(),:]
+            parameters:
+                shared_hour_filters - a dict of pandas dataframes with columns
+                    labeled 'START DATETIME' and 'END DATETIME' indicating
+                    blocks of demand hours, keyed by any label identifying the
+                    set of demand hours
 
-        # Filter curtailment data for reports containing dates within input
-        # range:
+            returns:
+                a dict of pandas dataframes with each resource id and
+                corresponding outage during the demand hours identified in
+                each input hour filter, keyed by the labels of the input dict.
+        '''
+        block_count = sum(len(shared_hour_filter) for shared_hour_filter in shared_hour_filters.values())
+        self.status_logger.log(f'Calculating EFORd with {block_count} Demand Period Blocks in {len(shared_hour_filters)} Sets.',criticality='INFORMATION')
+
+        # Get prepared forced outages:
+        df = self.get_forced_curtailment_data()
+
+        # Filter curtailment data for reports containing dates within the
+        # combined range of all hour filters:
         self.status_logger.log('\tFiltering curtailment reports.',criticality='INFORMATION')
-        start_datetime = shared_hour_filter.loc[:,'START DATETIME'].min().to_pydatetime()
-        end_datetime = shared_hour_filter.loc[:,'END DATETIME'].max().to_pydatetime()
-        
-        # Split curtailment data into smaller chunks for multiprocessing:
-        df_mp = [{
-            'df': x,
+        start_datetime = min(x.loc[:,'START DATETIME'].min() for x in shared_hour_filters.values()).to_pydatetime()
+        end_datetime = max(x.loc[:,'END DATETIME'].max() for x in shared_hour_filters.values()).to_pydatetime()
+
+        # Split curtailment data into a few chunks per processor, keeping only
+        # the columns used by the helper function to limit pickling:
+        processor_count = mp.cpu_count()
+        df = df.loc[:,[
+            'OUTAGE MRID',
+            'RESOURCE ID',
+            'NATURE OF WORK',
+            'CURTAILMENT START DATE TIME',
+            'CURTAILMENT END DATE TIME',
+            'CURTAILMENT MW'
+        ]]
+        df_mp = np.array_split(df,3*processor_count)
+
+        # Inputs shared by all chunks are passed to each worker process once
+        # when the pool starts, rather than with every chunk:
+        shared_inputs = {
             'start_datetime': start_datetime,
             'end_datetime': end_datetime,
-            'natures_of_work': self.natures_of_work,
-            'master_capability_list' : self.master_capability_list,
-            'shared_hour_filter' : shared_hour_filter
-        } for x in np.array_split(df,32)]
+            'commercial_operation_dates' : self.master_capability_list.drop_duplicates(subset='ResID').set_index('ResID').loc[:,'CommercialOperDate'],
+            'shared_hour_filters' : shared_hour_filters
+        }
+
+        # Run multiprocessing helper function on each chunk in parallel, taking
+        # results in order of completion since they are summed afterwards:
+        with mp.Pool(processes=processor_count,initializer=multiprocessing_initializer,initargs=(shared_inputs,)) as mp_pool:
+            chunk_results = list(mp_pool.imap_unordered(multiprocessing_helper_function,df_mp,chunksize=1))
+
+        # Combine results from all chunks for each hour filter, summing
+        # outages for resources split across chunks:
+        results = {}
+        for k in shared_hour_filters.keys():
+            results[k] = pd.concat(
+                [chunk_result[k] for chunk_result in chunk_results]
+            ).groupby(['RESOURCE ID','NATURE OF WORK'],observed=True,as_index=False).agg({
+                'OUTAGE MWH DURING DEMAND': 'sum'
+            })
+
+        return results
+    
+    def calculate_all_equivalent_forced_outage_rates(self,start_date:d,end_date:d,shared_hour_filters:dict=None,resource_hour_filter:pd.DataFrame=None):
+        '''
+        Evaluates the equivalent forced outage rates within a date range and,
+        optionally, during sets of shared demand hours and resource-level
+        demand hours. The curtailment data are prepared first so that all
+        calculations share a single prepared copy. The shared demand hours
+        calculation runs its pool of worker processes on the calling thread
+        before any other threads start, since forking while other threads are
+        running can leave the worker processes deadlocked, and the remaining
+        calculations then run concurrently on separate threads.
 
-        # Run multiprocessing helper function on each chunk in parallel:
-        with mp.Pool(processes=8) as mp_pool:
-            df = pd.concat(mp_pool.map(multiprocessing_helper_function,df_mp))
+            parameters:
+                start_date - a datetime.date object specifying the initial date
+                    of the range of dates for the EFOR calculation
+                end_date - a datetime.date object specifying the final date of
+                    the range of dates for the EFOR calculation
+                shared_hour_filters - an optional dict of pandas dataframes of
+                    shared demand hour blocks, as accepted by
+                    calculate_equivalent_forced_outage_rates_during_shared_demand_hours
+                resource_hour_filter - an optional pandas dataframe of resource-
+                    level demand hour blocks, as accepted by
+                    calculate_equivalent_forced_outage_rate_during_resource_demand_hours
 
-        df.sort_values(by=['RESOURCE ID','NATURE OF WORK'],inplace=True)
+            returns:
+                a dict containing the result of each calculation performed,
+                keyed by 'date range', 'shared demand hours' and 'resource
+                demand hours'
+        '''
+        self.get_forced_curtailment_data()
+        results = {}
+        if shared_hour_filters is not None:
+            results['shared demand hours'] = self.calculate_equivalent_forced_outage_rates_during_shared_demand_hours(shared_hour_filters)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {
+                'date range' : executor.submit(self.calculate_equivalent_forced_outage_rates_by_date_range,start_date,end_date)
+            }
+            if resource_hour_filter is not None:
+                futures['resource demand hours'] = executor.submit(self.calculate_equivalent_forced_outage_rate_during_resource_demand_hours,resource_hour_filter)
+            results.update({k:future.result() for k,future in futures.items()})
+        return results
+
+    @property
+    def curtailment_data(self):
+        return self._curtailment_data
+
+    @curtailment_data.setter
+    def curtailment_data(self,curtailment_data:pd.DataFrame):
+        # Clear results prepared from any previous curtailment data:
+        self._curtailment_data = curtailment_data
+        self.forced_curtailment_data = None
+        self.date_range_results = {}
+
+    def get_forced_curtailment_data(self):
+        '''
+        Gets prepared curtailment data for forced outages with the nature-of-
+        work codes listed in the configuration file and a known end datetime,
+        sorted by start datetime so that curtailments starting before a given
+        datetime can be found by binary search. The data are prepared and
+        filtered on the first call and reused by later calls, so callers must
+        not modify the returned dataframe in place.
+
+            returns:
+                a pandas dataframe of prepared forced outage curtailments
+        '''
+        if self.forced_curtailment_data is None:
+            df = self.prepare_curtailment_data()
+            include = df.loc[:,'CURTAILMENT END DATE TIME'].notnull() \
+                & (df.loc[:,'OUTAGE TYPE']=='FORCED')
+            if self.natures_of_work is not None:
+                include &= df.loc[:,'NATURE OF WORK'].isin(self.natures_of_work)
+            self.forced_curtailment_data = df.loc[include,:].sort_values('CURTAILMENT START DATE TIME',kind='mergesort')
+        return self.forced_curtailment_data
 
-        return df
-    
     def prepare_curtailment_data(self):
         '''
         Filters and condenses curtailment reports from multiple prior trade-day
@@ -297,17 +395,19 @@ class UCAPEvaluator:
         combined.
         '''
 
-        # Copy curtailment data for analysis:
-        df = self.curtailment_data.copy()
-
-        # Use last version of each reported outage time block:
-        df = df.groupby([
+        # Use last version of each reported outage time block, keeping the
+        # latest report of each block in a single pass over sorted reports:
+        time_block_columns = [
             'OUTAGE MRID',
             'RESOURCE ID',
             'OUTAGE TYPE',
             'NATURE OF WORK',
             'CURTAILMENT START DATE TIME'
-        ]).last().reset_index()
+        ]
+        df = self.curtailment_data.dropna(subset=time_block_columns).sort_values(
+            by=time_block_columns+['REPORT DATE'],
+            kind='mergesort'
+        ).drop_duplicates(subset=time_block_columns,keep='last')
 
         # Sort curtailment reports:
         df = df.sort_values(
@@ -319,161 +419,94 @@ class UCAPEvaluator:
             ]
         )
 
-        # Create a sequential index column and previous index for join
-        # operation:
-        df.loc[:,'ROW NUMBER'] = df.reset_index().index
-        df.loc[:,'PREVIOUS ROW NUMBER'] = df.loc[:,'ROW NUMBER'] - 1
-
-        # Join each record with the next time block in the same outage event:
-        df = df.set_index([
-            'ROW NUMBER',
+        # Take the start of the next time block in the same outage event from
+        # the following row wherever both rows belong to the same event:
+        event_columns = [
             'OUTAGE MRID',
             'RESOURCE ID',
             'OUTAGE TYPE',
             'NATURE OF WORK'
-        ]).join(
-            df.loc[
-                :,
-                [
-                    'PREVIOUS ROW NUMBER',
-                    'OUTAGE MRID',
-                    'RESOURCE ID',
-                    'OUTAGE TYPE',
-                    'NATURE OF WORK',
-                    'CURTAILMENT START DATE TIME',
-                    'CURTAILMENT END DATE TIME'
-                ]
-            ].rename(
-                columns={
-                    'PREVIOUS ROW NUMBER' : 'ROW NUMBER',
-                    'CURTAILMENT START DATE TIME' : 'NEXT CURTAILMENT START DATE TIME',
-                    'CURTAILMENT END DATE TIME' : 'NEXT CURTAILMENT END DATE TIME'
-                }
-            ).set_index([
-                'ROW NUMBER',
-                'OUTAGE MRID',
-                'RESOURCE ID',
-                'OUTAGE TYPE',
-                'NATURE OF WORK'
-            ]),
-            how='left'
-        ).reset_index()
+        ]
+        same_event = (df.loc[:,event_columns].shift(-1)==df.loc[:,event_columns]).all(axis='columns')
+        df.loc[:,'NEXT CURTAILMENT START DATE TIME'] = df.loc[:,'CURTAILMENT START DATE TIME'].shift(-1).where(same_event)
 
         # Replace missing end datetimes with the earlier of either the start of
         # the next report day or the start of the next time block with the same
         # MRID:
-        df.loc[
-            df.loc[:,'NEXT CURTAILMENT START DATE TIME'].isnull(),
-            'NEXT CURTAILMENT START DATE TIME'
-        ] = df.loc[
-            df.loc[:,'NEXT CURTAILMENT START DATE TIME'].isnull(),
-            'REPORT DATE'
-        ].map(lambda x: dt.combine(x,t(0,0,0)) + td(days=1))
-        df.loc[
-            df.loc[:,'CURTAILMENT END DATE TIME'].isnull(),
-            'CURTAILMENT END DATE TIME'
-        ] = df.loc[df.loc[:,'CURTAILMENT END DATE TIME'].isnull(),:].apply(
-            lambda r: min(
-                r.loc['NEXT CURTAILMENT START DATE TIME'],
-                dt.combine(r.loc['REPORT DATE'],t(0,0,0)) + td(days=1)
-            ),
-            axis='columns',
-            result_type='expand'
+        report_day_ends = df.loc[:,'REPORT DATE'].dt.normalize() + pd.Timedelta(days=1)
+        df.loc[:,'NEXT CURTAILMENT START DATE TIME'] = df.loc[:,'NEXT CURTAILMENT START DATE TIME'].fillna(report_day_ends)
+        missing_end = df.loc[:,'CURTAILMENT END DATE TIME'].isnull()
+        df.loc[missing_end,'CURTAILMENT END DATE TIME'] = np.minimum(
+            df.loc[missing_end,'NEXT CURTAILMENT START DATE TIME'].to_numpy(),
+            report_day_ends.loc[missing_end].to_numpy()
         )
 
         # Drop extra columns:
-        df = df.reset_index().drop(
-            columns=[
-                'index',
-                'ROW NUMBER',
-                'PREVIOUS ROW NUMBER',
-                'NEXT CURTAILMENT START DATE TIME',
-                'NEXT CURTAILMENT END DATE TIME'
-            ]
-        )
+        df = df.reset_index(drop=True).drop(columns=['NEXT CURTAILMENT START DATE TIME'])
 
         # Return results:
         return df
 
 ### Multiprocessing Helper Functions: ###
-def multiprocessing_helper_function(chunk):
+# Read-only inputs shared by all chunks, set in each worker process by
+# multiprocessing_initializer:
+worker_inputs = {}
+
+def multiprocessing_initializer(shared_inputs:dict):
+    '''
+    An initializer to be called once by each process of a multiprocessing pool,
+    storing the inputs shared by all chunks for use by the helper function.
+    '''
+    worker_inputs.update(shared_inputs)
+
+def multiprocessing_helper_function(df):
     '''
     A helper function to be called by a multiprocessing object's map() method,
-    along with chunked data passed individually as the chunk input.
+    along with chunked data passed individually as the df input. Returns a
+    dict of aggregated outages for each of the shared hour filters.
     '''
 
     # Filter curtailment data for reports within date range of the demand hours:
-    df = chunk['df']
-    df.loc[:,'INCLUDE'] = df.apply(
-        lambda r: datetime_range_overlap(
-                    chunk['start_datetime'],
-                    chunk['end_datetime'],
-                    r.loc['CURTAILMENT START DATE TIME'],
-                    r.loc['CURTAILMENT END DATE TIME']
-        )>0,
-        axis='columns',
-        result_type='expand'
-    )
-    df = df.loc[df.loc[:,'INCLUDE'],:].sort_values(by=['RESOURCE ID','OUTAGE MRID','NATURE OF WORK','CURTAILMENT START DATE TIME'])
-
-    # Filter curtailment data for forced outages and nature-of-work codes
-    # listed in the configuration file:
-    df = df.loc[(df.loc[:,'OUTAGE TYPE']=='FORCED'),:]
-    if chunk['natures_of_work'] is not None:
-        df.loc[:,'INCLUDE'] = df.apply(
-            lambda r: r.loc['NATURE OF WORK'] in chunk['natures_of_work'],
-            axis='columns',
-            result_type='expand'
-        )
-        df = df.loc[df.loc[:,'INCLUDE'],:]
+    include = (df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy()<np.datetime64(worker_inputs['end_datetime'])) \
+        & (df.loc[:,'CURTAILMENT END DATE TIME'].to_numpy()>np.datetime64(worker_inputs['start_datetime']))
+    df = df.loc[include,:].sort_values(by=['RESOURCE ID','OUTAGE MRID','NATURE OF WORK','CURTAILMENT START DATE TIME'])
 
     # Filter curtailment data using commercial operation start date in the
     # Master Capability List:
-    df = df.set_index('RESOURCE ID').join(
-        chunk['master_capability_list'].loc[:,['ResID','CommercialOperDate']].set_index('ResID')
-    ).reset_index().rename(
-        columns={
-            'index':'RESOURCE ID',
-            'CommercialOperDate':'COMMERCIAL OPERATION DATE'
-        }
-    )
-    df.loc[df.loc[:,'COMMERCIAL OPERATION DATE'].isnull(),'COMMERCIAL OPERATION DATE'] = dt(1900,1,1,0,0)
+    df.loc[:,'COMMERCIAL OPERATION DATE'] = df.loc[:,'RESOURCE ID'].map(worker_inputs['commercial_operation_dates']).astype('datetime64[ns]').fillna(dt(1900,1,1,0,0))
     df.loc[(df.loc[:,'CURTAILMENT END DATE TIME']>=df.loc[:,'COMMERCIAL OPERATION DATE']),:]
 
     # Constrain the starts of curtailments to commercial operation date:
-    df.loc[:,'CURTAILMENT START DATE TIME'] = df.apply(
-        lambda r: max(r.loc[['CURTAILMENT START DATE TIME','COMMERCIAL OPERATION DATE']]),
-        axis='columns',
-        result_type='expand'
+    df.loc[:,'CURTAILMENT START DATE TIME'] = np.maximum(
+        df.loc[:,'CURTAILMENT START DATE TIME'].to_numpy(),
+        df.loc[:,'COMMERCIAL OPERATION DATE'].to_numpy()
     )
 
-    # Calculate reported outage hours within date range and hour filter:
-    df = df.loc[
-        (df.loc[:,'CURTAILMENT START DATE TIME']<=chunk['shared_hour_filter'].loc[:,'END DATETIME'].max()) \
-        & (df.loc[:,'CURTAILMENT END DATE TIME']>=chunk['shared_hour_filter'].loc[:,'START DATETIME'].min()),
-        :
-    ]
-
-    # Calculate overlap between outage and demand hours:
-    df.loc[:,'APPLICABLE OUTAGE HOURS'] = df.apply(
-        lambda r:hour_filter_overlap(
-            r.loc['CURTAILMENT START DATE TIME'],
-            r.loc['CURTAILMENT END DATE TIME'],
-            chunk['shared_hour_filter']
-        ),
-        axis='columns',
-        result_type='expand'
-    )
+    # Calculate outages during each set of demand hours:
+    results = {}
+    for k,shared_hour_filter in worker_inputs['shared_hour_filters'].items():
+        # Calculate reported outage hours within date range and hour filter:
+        in_range = (df.loc[:,'CURTAILMENT START DATE TIME']<=shared_hour_filter.loc[:,'END DATETIME'].max()) \
+            & (df.loc[:,'CURTAILMENT END DATE TIME']>=shared_hour_filter.loc[:,'START DATETIME'].min())
+
+        # Calculate overlap between outage and demand hours:
+        applicable_outage_hours = hour_filter_overlap_batch(
+            df.loc[in_range,'CURTAILMENT START DATE TIME'].to_numpy(),
+            df.loc[in_range,'CURTAILMENT END DATE TIME'].to_numpy(),
+            shared_hour_filter
+        )
 
-    # Calculate curtailed capacity * outage duration during demand in MWh
-    df.loc[:,'OUTAGE MWH DURING DEMAND'] = df.loc[:,'CURTAILMENT MW'] \
-        * df.loc[:,'APPLICABLE OUTAGE HOURS']
+        # Calculate curtailed capacity * outage duration during demand in MWh
+        hf_df = df.loc[in_range,['RESOURCE ID','NATURE OF WORK']].assign(**{
+            'OUTAGE MWH DURING DEMAND' : df.loc[in_range,'CURTAILMENT MW'].to_numpy() * applicable_outage_hours
+        })
 
-    # Aggregate by resource id and nature-of-work:
-    df = df.loc[:,[
-        'RESOURCE ID','NATURE OF WORK','OUTAGE MWH DURING DEMAND'
-    ]].groupby(['RESOURCE ID','NATURE OF WORK']).agg({
-        'OUTAGE MWH DURING DEMAND': 'sum'
-    }).reset_index()
+        # Aggregate by resource id and nature-of-work, leaving groups unsorted
+        # since the results of all chunks are combined and sorted afterwards:
+        results[k] = hf_df.loc[:,[
+            'RESOURCE ID','NATURE OF WORK','OUTAGE MWH DURING DEMAND'
+        ]].groupby(['RESOURCE ID','NATURE OF WORK'],observed=True,sort=False,as_index=False).agg({
+            'OUTAGE MWH DURING DEMAND': 'sum'
+        })
 
-    return df
\ No newline at end of file
+    return results
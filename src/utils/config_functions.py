@@ -0,0 +1,36 @@
+import yaml
+from copy import deepcopy
+from pathlib import Path
+from functools import lru_cache
+
+# use the libyaml-based loader where pyyaml was built with it:
+Loader = getattr(yaml,'CSafeLoader',yaml.SafeLoader)
+
+@lru_cache(maxsize=None)
+def _load_yaml(path:Path,mtime_ns:int):
+    '''
+    Parses a yaml file, memoized by path and modification time so repeated
+    loads within a process only re-parse files which have changed.
+
+        parameters:
+            path - a path object pointing to a yaml file
+            mtime_ns - the modification time of the file in nanoseconds
+        returns:
+            the parsed contents of the yaml file
+    '''
+    with path.open('r') as f:
+        return yaml.load(f,Loader=Loader)
+
+def load_config(path):
+    '''
+    Loads a yaml configuration file, such as config/config.yaml or
+    config/login.yaml.
+
+        parameters:
+            path - a string or path object pointing to a yaml file
+        returns:
+            a copy of the parsed contents of the yaml file, which callers may
+            modify without affecting other callers
+    '''
+    path = Path(path).resolve()
+    return deepcopy(_load_yaml(path,path.stat().st_mtime_ns))
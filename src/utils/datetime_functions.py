@@ -1,5 +1,6 @@
+import numpy as np
 from datetime import datetime, timedelta
-from pandas import DataFrame
+from pandas import DataFrame,Index,IntervalIndex,to_datetime
 
 def datetime_range_overlap(tr0_0:datetime,tr0_1:datetime,tr1_0:datetime,tr1_1:datetime):
     '''
@@ -22,6 +23,36 @@ def datetime_range_overlap(tr0_0:datetime,tr0_1:datetime,tr1_0:datetime,tr1_1:da
     overlap = max( min(tr0_1, tr1_1) - max(tr0_0, tr1_0), timedelta(hours=0))
     return overlap.total_seconds() / 3600
 
+def datetime_range_overlap_batch(tr0_0:np.ndarray,tr0_1:np.ndarray,tr1_0,tr1_1):
+    '''
+    Calculate the duration of overlap between each of an array of datetime
+    ranges and a second datetime range or array of datetime ranges, in hours,
+    as elementwise arithmetic on the arrays rather than a call per range.
+
+        parameters:
+            tr0_0 - an array of datetime64 values specifying the start date and
+                time of each range in the first set
+            tr0_1 - an array of datetime64 values specifying the end date and
+                time of each range in the first set
+            tr1_0 - a datetime object, or an array of datetime64 values of the
+                same length as the first set, specifying the start date and
+                time of the second range or of each range in the second set
+            tr1_1 - a datetime object, or an array of datetime64 values of the
+                same length as the first set, specifying the end date and time
+                of the second range or of each range in the second set
+        returns:
+            an array of floating point values representing the duration in
+            hours of overlap between each range in the first set and the second
+            range or the corresponding range in the second set.
+    '''
+    range_start = np.maximum(np.asarray(tr0_0,dtype='datetime64[ns]'),np.asarray(tr1_0,dtype='datetime64[ns]'))
+    range_end = np.minimum(np.asarray(tr0_1,dtype='datetime64[ns]'),np.asarray(tr1_1,dtype='datetime64[ns]'))
+    # Clear negative overlaps by masking with the sign bit rather than
+    # comparing, then scale nanoseconds to hours:
+    overlap = (range_end - range_start).view('int64')
+    overlap &= ~(overlap >> 63)
+    return overlap * (1 / 3.6e12)
+
 def hour_filter_overlap(tr_0:datetime,tr_1:datetime,hour_filter:DataFrame):
     '''
     Calculates the total overlapping duration between a datetime range and a
@@ -39,20 +70,132 @@ def hour_filter_overlap(tr_0:datetime,tr_1:datetime,hour_filter:DataFrame):
             a floating point value representing the duration in hours of overlap
             between the input datetime range and list of hours.
     '''
-    overlap = 0
-    applicable_hour_filter = hour_filter.loc[
-        (hour_filter.loc[:,'START DATETIME']<=tr_1) & \
-        (hour_filter.loc[:,'END DATETIME']>=tr_0),
-        :
-    ]
-    for _,r in applicable_hour_filter.iterrows():
-        overlap += datetime_range_overlap(
-            tr_0,
-            tr_1,
-            r.loc['START DATETIME'].to_pydatetime(),
-            r.loc['END DATETIME'].to_pydatetime()
-        )
-    return overlap
+    # Clip each block to the range in a single pass over the block arrays:
+    overlap = datetime_range_overlap_batch(
+        hour_filter.loc[:,'START DATETIME'].to_numpy(),
+        hour_filter.loc[:,'END DATETIME'].to_numpy(),
+        tr_0,
+        tr_1
+    )
+    return overlap.sum()
+
+def hour_filter_overlap_batch(tr_0:np.ndarray,tr_1:np.ndarray,hour_filter:DataFrame):
+    '''
+    Calculates the total overlapping duration between each of an array of
+    datetime ranges and a dataframe of blocks of hours, without iterating over
+    either. The coverage of the blocks up to a time x is the sum over all blocks
+    of min(x,end)-min(x,start), so the overlap of a range with the blocks is
+    the difference in coverage between the end and start of the range. Each sum
+    is evaluated for all ranges at once by binary search into the sorted block
+    starts and ends and their cumulative sums.
+
+        parameters:
+            tr_0 - an array of datetime64 values specifying the start date and
+                time of each range
+            tr_1 - an array of datetime64 values specifying the end date and
+                time of each range
+            hour_filter - a dataframe of datetime objects representing blocks of
+                hours specified in 'START DATETIME' and 'END DATETIME' columns to compare the datetime ranges against
+
+        returns:
+            an array of floating point values representing the duration in hours
+            of overlap between each input datetime range and the blocks of
+            hours.
+    '''
+    if len(hour_filter)==0:
+        return np.zeros(len(tr_0))
+
+    # Convert datetimes to integer seconds relative to the first block to keep
+    # cumulative sums well within the range of 64-bit integers:
+    origin = hour_filter.loc[:,'START DATETIME'].min().to_datetime64()
+    def seconds(x):
+        return (np.asarray(x,dtype='datetime64[ns]') - origin) // np.timedelta64(1,'s')
+    block_starts = np.sort(seconds(hour_filter.loc[:,'START DATETIME']))
+    block_ends = np.sort(seconds(hour_filter.loc[:,'END DATETIME']))
+    cumulative_block_starts = np.concatenate([[0],np.cumsum(block_starts)])
+    cumulative_block_ends = np.concatenate([[0],np.cumsum(block_ends)])
+
+    def coverage(x):
+        started = np.searchsorted(block_starts,x,side='right')
+        ended = np.searchsorted(block_ends,x,side='right')
+        return cumulative_block_ends[ended] - cumulative_block_starts[started] + (started-ended)*x
+
+    # Clear negative overlaps by masking with the sign bit:
+    overlap = coverage(seconds(tr_1)) - coverage(seconds(tr_0))
+    overlap &= ~(overlap >> 63)
+    return overlap / 3600
+
+def grouped_hour_filter_overlap_batch(tr_0:np.ndarray,tr_1:np.ndarray,groups:np.ndarray,hour_filter:DataFrame,group_column:str='RESOURCE ID'):
+    '''
+    Calculates the total overlapping duration between each of an array of
+    datetime ranges and the blocks of hours belonging to the same group, such as
+    the demand hours of each resource, for all groups at once. Blocks are
+    sorted by group and then by time, so that the blocks of each group are
+    contiguous and each range is compared only against its own group's blocks
+    through binary search on combined group and time keys, as in
+    hour_filter_overlap_batch.
+
+        parameters:
+            tr_0 - an array of datetime64 values specifying the start date and
+                time of each range
+            tr_1 - an array of datetime64 values specifying the end date and
+                time of each range
+            groups - an array of labels specifying the group of each range
+            hour_filter - a dataframe of datetime objects representing blocks of
+                hours specified in 'START DATETIME' and 'END DATETIME' columns,
+                with the group of each block in the group column
+            group_column - the label of the column of hour_filter containing
+                the group of each block
+
+        returns:
+            an array of floating point values representing the duration in hours
+            of overlap between each input datetime range and the blocks of hours
+            in its group; ranges in groups without blocks have no overlap.
+    '''
+    if len(hour_filter)==0:
+        return np.zeros(len(tr_0))
+
+    # Convert datetimes to integer seconds relative to the earliest datetime,
+    # and offset each group by a span longer than all datetimes so that keys
+    # of different groups never interleave:
+    def seconds(x):
+        return np.asarray(x,dtype='datetime64[ns]').astype('int64') // 1_000_000_000
+    range_starts = seconds(tr_0)
+    range_ends = seconds(tr_1)
+    block_starts = seconds(hour_filter.loc[:,'START DATETIME'])
+    block_ends = seconds(hour_filter.loc[:,'END DATETIME'])
+    origin = min(block_starts.min(),range_starts.min(initial=block_starts.min()))
+    span = max(block_ends.max(),range_ends.max(initial=block_ends.max())) - origin + 1
+
+    group_labels,block_groups = np.unique(hour_filter.loc[:,group_column].to_numpy(),return_inverse=True)
+    range_groups = Index(group_labels).get_indexer(groups)
+    in_group = range_groups>=0
+
+    # Sort blocks by group and time, keeping cumulative sums of times within
+    # each group relative to the origin:
+    def sorted_keys(x):
+        order = np.lexsort((x,block_groups))
+        keys = block_groups[order]*span + (x[order]-origin)
+        return keys,np.concatenate([[0],np.cumsum(x[order]-origin)])
+    start_keys,cumulative_block_starts = sorted_keys(block_starts)
+    end_keys,cumulative_block_ends = sorted_keys(block_ends)
+    group_offsets = np.arange(len(group_labels))*span
+
+    def coverage(x,g):
+        group_start = np.searchsorted(start_keys,group_offsets[g],side='left')
+        group_end = np.searchsorted(end_keys,group_offsets[g],side='left')
+        started = np.searchsorted(start_keys,group_offsets[g]+x,side='right')
+        ended = np.searchsorted(end_keys,group_offsets[g]+x,side='right')
+        return (cumulative_block_ends[ended] - cumulative_block_ends[group_end]) \
+            - (cumulative_block_starts[started] - cumulative_block_starts[group_start]) \
+            + ((started-group_start) - (ended-group_end))*x
+
+    # Clear negative overlaps by masking with the sign bit:
+    g = range_groups[in_group]
+    overlap = np.zeros(len(tr_0),dtype='int64')
+    overlap[in_group] = coverage(range_ends[in_group]-origin,g) - coverage(range_starts[in_group]-origin,g)
+    overlap &= ~(overlap >> 63)
+    return overlap / 3600
 
 def select_hours_within_datetime_range(tr_0:datetime,tr_1:datetime,hour_filter:DataFrame):
     '''
@@ -79,6 +222,80 @@ def select_hours_within_datetime_range(tr_0:datetime,tr_1:datetime,hour_filter:D
         :
     ].reset_index()
 
+def select_hours_within_datetime_ranges(tr_0:np.ndarray,tr_1:np.ndarray,hour_filter:DataFrame):
+    '''
+    Extracts the subsets of hours from a list of hours which fall within each
+    of a set of datetime ranges, tagging each selected hour with the position
+    of the range containing it. Hours are selected for all ranges in a single
+    pass unless ranges overlap, such as an annual season alongside monthly
+    seasons, in which case hours are selected for each range in turn and an
+    hour within several ranges is returned once for each. A range ending before
+    it starts, such as a winter season spanning the end of a year, is treated
+    as wrapping around the year, covering the hours from its start to the end
+    of its starting year and from the start of its ending year to its end.
+
+        parameters:
+            tr_0 - an array of datetime values specifying the start date and
+                time of each range
+            tr_1 - an array of datetime values specifying the end date and time
+                of each range
+            hour_filter - a pandas dataframe with columns labeled
+                'START DATETIME', 'END DATETIME' and 'DEMAND HOUR', and
+                optionally 'RESOURCE ID', indicating selected hours, generally
+                expected to constitute a year of hours.
+
+        returns:
+            a pandas dataframe of hours selected from the input list containing
+            only hours within one of the datetime ranges bounded by the input
+            datetimes, with an added 'RANGE' column giving the position of that
+            range in the input arrays.
+    '''
+    tr_0 = to_datetime(tr_0).to_numpy()
+    tr_1 = to_datetime(tr_1).to_numpy()
+
+    # Split each wrapped range into a range ending at the start of the year
+    # following its start and a range starting at the start of its end's year:
+    wrapped = tr_1<tr_0
+    range_starts = np.concatenate([
+        tr_0,
+        tr_1[wrapped].astype('datetime64[Y]').astype(tr_0.dtype)
+    ])
+    range_ends = np.concatenate([
+        np.where(wrapped,(tr_0.astype('datetime64[Y]')+1).astype(tr_0.dtype),tr_1),
+        tr_1[wrapped]
+    ])
+    range_positions = np.concatenate([np.arange(len(tr_0)),np.flatnonzero(wrapped)])
+    ranges = IntervalIndex.from_arrays(range_starts,range_ends,closed='left')
+
+    start_datetimes = hour_filter.loc[:,'START DATETIME'].to_numpy()
+    end_datetimes = hour_filter.loc[:,'END DATETIME'].to_numpy()
+    if not ranges.is_overlapping:
+        range_indices = ranges.get_indexer(start_datetimes)
+        hour_indices = np.flatnonzero(range_indices>=0)
+        range_indices = range_indices[hour_indices]
+        within_range = end_datetimes[hour_indices] <= range_ends[range_indices]
+        hour_indices = hour_indices[within_range]
+        range_indices = range_indices[within_range]
+    else:
+        # Select hours within each range in turn, then order the selected
+        # hours as in the input list:
+        selections = [
+            np.flatnonzero(
+                (start_datetimes>=range_start) & \
+                (start_datetimes<range_end) & \
+                (end_datetimes<=range_end)
+            )
+            for range_start,range_end in zip(range_starts,range_ends)
+        ]
+        hour_indices = np.concatenate([np.array([],dtype=int)]+selections)
+        range_indices = np.repeat(np.arange(len(ranges)),[len(selection) for selection in selections])
+        order = np.lexsort((range_indices,hour_indices))
+        hour_indices = hour_indices[order]
+        range_indices = range_indices[order]
+    hour_filter = hour_filter.iloc[hour_indices,:].reset_index()
+    hour_filter.loc[:,'RANGE'] = range_positions[range_indices]
+    return hour_filter
+
 def coalesce_hour_filter(hour_filter:DataFrame):
     '''
     Combines contiguous hours with the same Demand Hour value (true or false)
@@ -106,26 +323,20 @@ def coalesce_hour_filter(hour_filter:DataFrame):
     columns = filter(lambda s:s in hour_filter.columns,['RESOURCE ID','START DATETIME','END DATETIME','SEASON','DEMAND HOUR'])
     hour_filter = hour_filter.loc[:,columns]
 
-    # Iterate through hours to find consecutive blocks with the same DEMAND HOUR
-    # value:
+    # Find consecutive blocks with the same DEMAND HOUR value by marking each
+    # hour that does not continue the previous one, then carry the start of
+    # each block forward to every hour within it:
     use_resource_id = 'RESOURCE ID' in hour_filter.columns
+    start_datetimes = hour_filter.loc[:,'START DATETIME'].to_numpy()
+    end_datetimes = hour_filter.loc[:,'END DATETIME'].to_numpy()
+    demand_hours = hour_filter.loc[:,'DEMAND HOUR'].to_numpy()
+    new_block = np.ones(len(hour_filter),dtype=bool)
+    new_block[1:] = (end_datetimes[:-1]!=start_datetimes[1:]) | (demand_hours[:-1]!=demand_hours[1:])
     if use_resource_id:
-        for i in hour_filter.index:
-            if i<max(hour_filter.index) and \
-                hour_filter.loc[i,'RESOURCE ID']==hour_filter.loc[i+1,'RESOURCE ID'] and \
-                hour_filter.loc[i,'END DATETIME']==hour_filter.loc[i+1,'START DATETIME'] and \
-                hour_filter.loc[i,'DEMAND HOUR']==hour_filter.loc[i+1,'DEMAND HOUR']:
-                    hour_filter.loc[i+1,'START DATETIME'] = hour_filter.loc[i,'START DATETIME']
-            else:
-                pass
-    else:
-        for i in hour_filter.index:
-            if i<max(hour_filter.index) and \
-                hour_filter.loc[i,'END DATETIME']==hour_filter.loc[i+1,'START DATETIME'] and \
-                hour_filter.loc[i,'DEMAND HOUR']==hour_filter.loc[i+1,'DEMAND HOUR']:
-                    hour_filter.loc[i+1,'START DATETIME'] = hour_filter.loc[i,'START DATETIME']
-            else:
-                pass
+        resource_ids = hour_filter.loc[:,'RESOURCE ID'].to_numpy()
+        new_block[1:] |= resource_ids[:-1]!=resource_ids[1:]
+    block_starts = np.flatnonzero(new_block)
+    hour_filter.loc[:,'START DATETIME'] = start_datetimes[block_starts[np.cumsum(new_block)-1]]
 
     # Aggregate hours into blocks with start and end datetimes:
     if use_resource_id:
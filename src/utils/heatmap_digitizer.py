@@ -52,16 +52,17 @@ def mouse_callback(event, x, y, flags, params):
     else:
         pass
 
-# average value of each cell in 6x6 matrix
-avg_table = np.zeros((3, 6, 6))
+if __name__=='__main__':
+    # average value of each cell in 6x6 matrix
+    avg_table = np.zeros((3, 6, 6))
 
-# create window and callback
-winname = 'img'
-cv2.namedWindow(winname)
-cv2.setMouseCallback(winname, mouse_callback)
+    # create window and callback
+    winname = 'img'
+    cv2.namedWindow(winname)
+    cv2.setMouseCallback(winname, mouse_callback)
 
-# read & display image
-image = cv2.imread('C:\Downloads\supply_cushion_heatmap_2023.png', 1)
-cv2.imshow(winname, image)
-cv2.waitKey()  # press any key to exit
-cv2.destroyAllWindows()
\ No newline at end of file
+    # read & display image
+    image = cv2.imread('C:\Downloads\supply_cushion_heatmap_2023.png', 1)
+    cv2.imshow(winname, image)
+    cv2.waitKey()  # press any key to exit
+    cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,53 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from pandas import DataFrame
+
+def write_parquet(df:DataFrame,path:Path,categorical_columns:list=[]):
+    '''
+    Saves a dataframe to a parquet file using the pyarrow engine with snappy
+    compression, dictionary encoding, column statistics, and large row groups
+    to support predicate pushdown when the file is read.
+
+        parameters:
+            df - a pandas dataframe to save
+            path - a path object pointing to the parquet file to write
+            categorical_columns - a list of low-cardinality string columns to
+                convert to the category dtype before writing, if present, so
+                they are stored as dictionary-encoded columns
+    '''
+    categorical_columns = [c for c in categorical_columns if c in df.columns]
+    if len(categorical_columns)>0:
+        df = df.astype({c:'category' for c in categorical_columns})
+    df.to_parquet(
+        path,
+        engine='pyarrow',
+        compression='snappy',
+        index=False,
+        row_group_size=256_000,
+        use_dictionary=True,
+        write_statistics=True,
+    )
+
+def append_parquet_dataset(df:DataFrame,path:Path,partition_columns:list=[]):
+    '''
+    Appends a dataframe to a directory of parquet files partitioned by the
+    values in one or more columns, writing only new files with unique names so
+    existing files in the dataset are left in place. The dataset can be read
+    back with pandas.read_parquet, which includes the partition columns.
+
+        parameters:
+            df - a pandas dataframe to append to the dataset
+            path - a path object pointing to the dataset directory, which is
+                created if it does not exist
+            partition_columns - a list of columns whose values determine the
+                subdirectory in which each row is written
+    '''
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df,preserve_index=False),
+        str(path),
+        partition_cols=partition_columns,
+        compression='snappy',
+        use_dictionary=True,
+        write_statistics=True,
+    )
@@ -1,9 +1,16 @@
+import re
+
+# Matches placeholders of one or more characters enclosed in square brackets:
+placeholder_pattern = re.compile(r'\[([^\[\]]+)\]')
+
 def replace_template_placeholders(template:str,replacements:dict):
     '''
     Replaces placeholders  defined as square brackets containing keywords in an
-    input template string with values from an input dictionary.
+    input template string with values from an input dictionary. Placeholders
+    are found and replaced in a single pass over the template, and those
+    without a keyword in the dictionary are left in place.
     '''
-    s = template
-    for k,v in replacements.items():
-        s = s.replace('[' + k + ']',v)
-    return s
+    return placeholder_pattern.sub(
+        lambda m: replacements.get(m.group(1),m.group(0)),
+        template
+    )
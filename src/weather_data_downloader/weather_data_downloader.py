@@ -1,10 +1,13 @@
-import pycurl
 import requests
+import threading
 import pandas as pd
 from pathlib import Path
 from pandas import Timestamp as ts
+from concurrent.futures import ThreadPoolExecutor,as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from caiso_logging import DataLogger
+from src.logging.logging import DataLogger
 
 class WeatherDownloader:
     '''
@@ -14,6 +17,10 @@ class WeatherDownloader:
     weather_stations = []
     years = []
     logger = None
+    max_concurrent_downloads = 16
+    # files reported smaller than this many bytes are read into memory and
+    # written in one call rather than streamed:
+    buffered_download_limit = 10*2**20
     weather_station_placenames_path = Path(r'M:\Users\RH2\src\caiso_curtailments\geospatial\weather_station_placenames.csv')
     def __init__(
         self,
@@ -26,11 +33,50 @@ class WeatherDownloader:
             'effective_date' : 'datetime64[D]',
             'weather_station' : 'string',
             'download_path' : 'string',
+            'etag' : 'string',
+            'last_modified' : 'string',
         }
         self.download_directory_path = download_directory_path
         self.weather_stations = weather_stations
         self.years = years
         self.logger = DataLogger(dtypes=log_dtypes,log_path=log_path,delimiter=',')
+        # the data file id of each weather station is read once here rather
+        # than for every url:
+        weather_station_placenames = pd.read_csv(
+            self.weather_station_placenames_path,
+            usecols=['StationID','FileID'],
+            dtype={'StationID':'string','FileID':'string'}
+        )
+        self.weather_station_file_ids = dict(zip(
+            weather_station_placenames.loc[:,'StationID'],
+            weather_station_placenames.loc[:,'FileID']
+        ))
+        # Map the year and weather station of each logged download to the
+        # ETag and Last-Modified validators of the latest download, for
+        # constant-time checks against previously downloaded files and for
+        # conditional requests when downloading them again:
+        self.downloaded_files = dict(zip(
+            zip(
+                self.logger.data.loc[:,'effective_date'],
+                self.logger.data.loc[:,'weather_station']
+            ),
+            zip(
+                self.logger.data.loc[:,'etag'],
+                self.logger.data.loc[:,'last_modified']
+            )
+        ))
+        # downloads run on multiple threads, which share the logger:
+        self.logger_lock = threading.Lock()
+        # all files come from the same host, so a single session keeps its
+        # connections open for reuse across downloads:
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_concurrent_downloads,
+            pool_maxsize=self.max_concurrent_downloads,
+            max_retries=Retry(total=3,backoff_factor=0.5)
+        )
+        self.session.mount('https://',adapter)
+        self.session.mount('http://',adapter)
 
     def get_url(self,weather_station_id:str,year:ts):
         '''
@@ -46,10 +92,8 @@ class WeatherDownloader:
                 weather data is requested.
         '''
         url_template = r'https://www.ncei.noaa.gov/data/global-hourly/access/{}/{}.csv'
-        weather_station_placenames = pd.read_csv(self.weather_station_placenames_path)
-        weather_station_placenames.set_index('StationID',inplace=True)
-        if weather_station_id in weather_station_placenames.index:
-            file_id = weather_station_placenames.loc[weather_station_id,'FileID']
+        if weather_station_id in self.weather_station_file_ids:
+            file_id = self.weather_station_file_ids[weather_station_id]
             url = url_template.format(year.year,file_id)
         else:
             url = ''
@@ -83,7 +127,8 @@ class WeatherDownloader:
         Downloads and saves a weather data file from the NCEI/NOAA hourly global
         surface temperature database based on the input weather station and
         year. When requesting weather data for the current year, only a partial
-        year of data is retrieved.
+        year of data is retrieved. Files downloaded before are requested
+        conditionally on having changed since, and kept as they are if not.
 
         Parameters:
             weather_station_id - a unique four-letter abbreviation for a weather
@@ -96,45 +141,91 @@ class WeatherDownloader:
                 should be saved.
             overwrite - a boolean value indicating whether files already
                 downloaded should be overwritten. Default value is True.
+
+        Returns:
+            True if the file was downloaded, skipped as already downloaded, or
+            not modified since it was last downloaded; False if the request
+            failed or timed out.
         '''
         url = self.get_url(weather_station_id,year)
-        if (
-            (year==self.logger.data.loc[:,'effective_date']) & \
-            (weather_station_id==self.logger.data.loc[:,'weather_station'])
-        ).any() and not overwrite:
+        if (ts(year),weather_station_id) in self.downloaded_files and not overwrite:
             filename = download_path.name
             print(f'Skipping file already downloaded: {filename}')
         else:
+            # Only request the file again if it has changed since it was last
+            # downloaded:
+            headers = {}
+            etag,last_modified = self.downloaded_files.get((ts(year),weather_station_id),('',''))
+            if download_path.is_file():
+                if etag!='':
+                    headers['If-None-Match'] = etag
+                if last_modified!='':
+                    headers['If-Modified-Since'] = last_modified
             try:
-                with download_path.open('wb') as f:
-                    c = pycurl.Curl()
-                    c.setopt(c.URL,url)
-                    c.setopt(c.WRITEDATA,f)
-                    c.perform()
-                    c.close()
+                with self.session.get(url,headers=headers,stream=True,timeout=30) as r:
+                    r.raise_for_status()
+                    if r.status_code==304:
+                        print(f'Skipping file not modified since last download: {download_path.name}')
+                        return True
+                    # Write to a temporary file, replacing any earlier download
+                    # only once the transfer completes, so that an interrupted
+                    # transfer never leaves a partial file at the download path:
+                    partial_path = download_path.with_name(download_path.name + '.part')
+                    if int(r.headers.get('Content-Length',self.buffered_download_limit))<self.buffered_download_limit:
+                        partial_path.write_bytes(r.content)
+                    else:
+                        # iter_content raises read failures and timeouts
+                        # during the transfer as requests exceptions:
+                        with partial_path.open('wb') as f:
+                            for chunk in r.iter_content(chunk_size=1<<20):
+                                f.write(chunk)
+                    partial_path.replace(download_path)
                     log_entry= pd.Series({
                         'effective_date' : year,
                         'weather_station' : weather_station_id,
-                        'download_path' : str(download_path)
+                        'download_path' : str(download_path),
+                        'etag' : r.headers.get('ETag',''),
+                        'last_modified' : r.headers.get('Last-Modified',''),
                     })
-                    self.logger.log(log_entry)
-                    self.logger.commit()
+                    with self.logger_lock:
+                        self.logger.log(log_entry)
+                        self.logger.commit()
+                        self.downloaded_files[(ts(year),weather_station_id)] = (log_entry.loc['etag'],log_entry.loc['last_modified'])
                     print(f'Downloaded {download_path}')
-            except (requests.exceptions.HTTPError, requests.exceptions.ConnectionError):
-                print('Specified File Not Available at Given URL')
+            except requests.exceptions.RequestException as error:
+                # Includes HTTP errors, failed connections, and timeouts:
+                print(f'Unable to download {download_path.name}: {error}')
+                partial_path = download_path.with_name(download_path.name + '.part')
+                if partial_path.is_file():
+                    partial_path.unlink()
+                return False
+        return True
 
     def download_all(self,overwrite:bool=True):
         '''
         Downloads all data files for the weather stations and years specified
-        in the object attributes, and saves to the default locations.
+        in the object attributes, and saves to the default locations. Files are
+        downloaded concurrently on a pool of threads, up to the number set in
+        max_concurrent_downloads, and the download log is written once all
+        downloads finish.
         '''
         errors = []
-        for year in self.years:
-            for weather_station in self.weather_stations:
-                output_path = self.get_path(weather_station,year)
-                try:
-                    self.download_weather_data(weather_station,year,output_path,overwrite)
-                except (requests.exceptions.HTTPError,requests.exceptions.ConnectionError):
+        # Defer writing the log until all downloads finish, or fail:
+        with self.logger.batched(), ThreadPoolExecutor(max_workers=self.max_concurrent_downloads) as executor:
+            futures = {
+                executor.submit(
+                    self.download_weather_data,
+                    weather_station,
+                    year,
+                    self.get_path(weather_station,year),
+                    overwrite
+                ) : (weather_station,year) \
+                for year in self.years \
+                for weather_station in self.weather_stations
+            }
+            for future in as_completed(futures):
+                weather_station,year = futures[future]
+                if not future.result():
                     errors += [f'{weather_station} - {year.year}']
         if len(errors)>0:
             print('Unable to retrieve data files for the following weather stations and years:\n\t' + '\n\t'.join(errors))
@@ -150,8 +241,10 @@ if __name__=='__main__':
         'KSAC','KSAN','KSBA','KSCK',
         'KSFO','KSJC','KSMF','KUKI'
     ]
-    weather_stations = list(pd.read_csv(Path(r'M:\Users\RH2\src\caiso_curtailments\geospatial\weather_station_placenames.csv')).loc[:,'StationID'])
     years = [ts(year,1,1) for year in range(2023,2025)]
     log_path = download_directory / r'download_log.csv'
     weather_downloader = WeatherDownloader(download_directory,weather_stations,years,log_path)
+    # download all weather stations in the placenames file already read by the
+    # downloader:
+    weather_downloader.weather_stations = list(weather_downloader.weather_station_file_ids)
     weather_downloader.download_all(overwrite=False)
\ No newline at end of file
@@ -21,12 +21,12 @@ class TestCurtailmentReportDownloader(unittest.TestCase):
         self.curtailment_report_downloader = CurtailmentReportDownloader(self.config)
 
         # Generate a set of dates representing each standard and exception rule
-        # in the configuration settings.
+        # in the configuration settings. Standard dates are tracked as one byte
+        # per day from the first available date, cleared for each date covered
+        # by an exception.
         first_date = self.config['caiso_curtailment_reports']['first_available_date']
-        standard_dates = [ \
-            first_date + td(days=n) for n in \
-            range((d.today()-first_date).days+1) \
-        ]
+        first_ordinal = first_date.toordinal()
+        standard_date_mask = bytearray(b'\x01') * ((d.today()-first_date).days+1)
         standard_template = self.config['caiso_curtailment_reports']['url']['standard']
         test_categories = []
         test_dates = []
@@ -39,24 +39,23 @@ class TestCurtailmentReportDownloader(unittest.TestCase):
                     exc['dates'][0] + td(days=n) for n in \
                     range((exc['dates'][1]-exc['dates'][0]).days + 1) \
                 ]
-                standard_dates = list(filter( \
-                    lambda x:x not in exception_dates, \
-                    standard_dates \
-                ))
                 test_categories.append(f'Exception {exception_number} - Date Range')
                 test_dates.append(random.choice(exception_dates))
                 test_templates.append(exc['template'])
             elif exc['type']=='list':
                 exception_dates = exc['dates']
-                standard_dates = list(filter( \
-                    lambda x:x not in exception_dates, \
-                    standard_dates \
-                ))
                 test_categories.append(f'Exception {exception_number} - Date List')
                 test_dates.append(random.choice(exception_dates))
                 test_templates.append(exc['template'])
             else:
-                pass
+                exception_dates = []
+            for exception_date in exception_dates:
+                if 0<=exception_date.toordinal()-first_ordinal<len(standard_date_mask):
+                    standard_date_mask[exception_date.toordinal()-first_ordinal] = 0
+        standard_dates = [ \
+            d.fromordinal(first_ordinal+n) for n,is_standard in \
+            enumerate(standard_date_mask) if is_standard \
+        ]
         test_categories.append('Standard')
         test_dates.append(random.choice(standard_dates))
         test_templates.append(standard_template)
@@ -69,12 +68,13 @@ class TestCurtailmentReportDownloader(unittest.TestCase):
         # configuration settings.
         for category,date,template in zip(self.test_categories,self.test_dates,self.test_templates):
             url = self.curtailment_report_downloader.url_by_date(date)
+            parsed_date = dt.strptime(url,template).date()
             print('URL Test - ' + category)
-            print('\tTest Date:\t' + date.strftime('%Y-%m-%d'))
+            print('\tTest Date:\t' + date.isoformat())
             print('\tTemplate:\t' + template)
             print('\tURL:\t\t' + url)
-            print('\tParsed Date:\t' + dt.strptime(url,template).strftime('%Y-%m-%d'))
-            if dt.strptime(url,template).date()==date:
+            print('\tParsed Date:\t' + parsed_date.isoformat())
+            if parsed_date==date:
                 print('\tPASS: URL matches applicable template')
             else:
                 print('\tFAIL: URL does not match applicable template!')
@@ -83,12 +83,13 @@ class TestCurtailmentReportDownloader(unittest.TestCase):
         template = self.config['caiso_curtailment_reports']['download_path_template']
         for date in self.test_dates:
             path = self.curtailment_report_downloader.download_path_by_date(date)
+            parsed_date = dt.strptime(str(path),template).date()
             print('Download Path Test')
-            print('\tTest Date:\t' + date.strftime('%Y-%m-%d'))
+            print('\tTest Date:\t' + date.isoformat())
             print('\tTemplate:\t' + template)
             print(f'\tDownload Path:\t{path}')
-            print('\tParsed Date:\t' + dt.strptime(str(path),template).strftime('%Y-%m-%d'))
-            if dt.strptime(str(path),template).date()==date:
+            print('\tParsed Date:\t' + parsed_date.isoformat())
+            if parsed_date==date:
                 print('\tPASS: Download path matches template')
             else:
                 print('\tFAIL: Download path does not match template')
@@ -0,0 +1,136 @@
+import sys
+import unittest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime as dt
+
+sys.path=[str(Path(__file__).parents[1])] + sys.path
+from src.utils.datetime_functions import datetime_range_overlap,datetime_range_overlap_batch,hour_filter_overlap,hour_filter_overlap_batch,grouped_hour_filter_overlap_batch,select_hours_within_datetime_range,select_hours_within_datetime_ranges,coalesce_hour_filter
+
+class TestDatetimeFunctions(unittest.TestCase):
+    def __init__(self,*args,**kwargs):
+        # Modifies the class initializer to build a set of hour blocks and
+        # datetime ranges to compare:
+        super(TestDatetimeFunctions,self).__init__(*args,**kwargs)
+        rng = np.random.default_rng(0)
+        start_datetimes = pd.Timestamp(dt(2022,1,1)) + pd.to_timedelta(np.sort(rng.integers(0,8000,300)),unit='h')
+        self.hour_filter = pd.DataFrame({
+            'START DATETIME' : start_datetimes,
+            'END DATETIME' : start_datetimes + pd.to_timedelta(rng.integers(1,5,300),unit='h'),
+        })
+        self.tr_0 = pd.Timestamp(dt(2022,1,1)) + pd.to_timedelta(rng.integers(-100,480000,200),unit='min')
+        self.tr_1 = self.tr_0 + pd.to_timedelta(rng.integers(-100,5000,200),unit='min')
+
+    def test_datetime_range_overlap_batch(self):
+        # Tests that the vectorized overlap with a single range matches the
+        # overlap calculated for each range separately:
+        start_datetime = dt(2022,3,1)
+        end_datetime = dt(2022,6,1)
+        expected = [datetime_range_overlap(tr_0.to_pydatetime(),tr_1.to_pydatetime(),start_datetime,end_datetime) for tr_0,tr_1 in zip(self.tr_0,self.tr_1)]
+        overlap = datetime_range_overlap_batch(self.tr_0.to_numpy(),self.tr_1.to_numpy(),start_datetime,end_datetime)
+        np.testing.assert_allclose(overlap,expected)
+
+    def test_datetime_range_overlap_batch_pairwise(self):
+        # Tests that the vectorized overlap between corresponding ranges of two
+        # sets matches the overlap calculated for each pair separately:
+        tr_0 = self.tr_0[::-1]
+        tr_1 = self.tr_1[::-1]
+        expected = [datetime_range_overlap(a_0.to_pydatetime(),a_1.to_pydatetime(),b_0.to_pydatetime(),b_1.to_pydatetime()) for a_0,a_1,b_0,b_1 in zip(self.tr_0,self.tr_1,tr_0,tr_1)]
+        overlap = datetime_range_overlap_batch(self.tr_0.to_numpy(),self.tr_1.to_numpy(),tr_0.to_numpy(),tr_1.to_numpy())
+        np.testing.assert_allclose(overlap,expected)
+
+    def test_hour_filter_overlap_batch(self):
+        # Tests that the vectorized overlap matches the row-by-row overlap:
+        expected = [hour_filter_overlap(tr_0.to_pydatetime(),tr_1.to_pydatetime(),self.hour_filter) for tr_0,tr_1 in zip(self.tr_0,self.tr_1)]
+        overlap = hour_filter_overlap_batch(self.tr_0.to_numpy(),self.tr_1.to_numpy(),self.hour_filter)
+        np.testing.assert_allclose(overlap,expected)
+
+    def test_hour_filter_overlap_batch_empty_filter(self):
+        # Tests that an empty hour filter yields no overlap:
+        overlap = hour_filter_overlap_batch(self.tr_0.to_numpy(),self.tr_1.to_numpy(),self.hour_filter.iloc[:0,:])
+        np.testing.assert_array_equal(overlap,np.zeros(len(self.tr_0)))
+
+    def test_grouped_hour_filter_overlap_batch(self):
+        # Tests that the overlap with each group's blocks calculated for all
+        # groups at once matches the overlap calculated for each group
+        # separately, and that ranges in groups without blocks have none:
+        hour_filter = self.hour_filter.assign(**{'RESOURCE ID':np.arange(len(self.hour_filter))%3})
+        groups = np.arange(len(self.tr_0))%4
+        overlap = grouped_hour_filter_overlap_batch(self.tr_0.to_numpy(),self.tr_1.to_numpy(),groups,hour_filter)
+        for group in range(4):
+            expected = hour_filter_overlap_batch(
+                self.tr_0.to_numpy()[groups==group],
+                self.tr_1.to_numpy()[groups==group],
+                hour_filter.loc[hour_filter.loc[:,'RESOURCE ID']==group,:]
+            )
+            np.testing.assert_allclose(overlap[groups==group],expected)
+
+    def test_select_hours_within_datetime_ranges(self):
+        # Tests that hours selected for all ranges at once match the hours
+        # selected for each range separately:
+        tr_0 = [dt(2022,1,1),dt(2022,6,1),dt(2022,11,1)]
+        tr_1 = [dt(2022,5,31),dt(2022,11,1),dt(2023,1,1)]
+        selected_hours = select_hours_within_datetime_ranges(np.array(tr_0),np.array(tr_1),self.hour_filter)
+        for i,(start_datetime,end_datetime) in enumerate(zip(tr_0,tr_1)):
+            expected = select_hours_within_datetime_range(start_datetime,end_datetime,self.hour_filter)
+            pd.testing.assert_frame_equal(
+                selected_hours.loc[selected_hours.loc[:,'RANGE']==i,:].drop(columns='RANGE').reset_index(drop=True),
+                expected
+            )
+
+    def test_select_hours_within_overlapping_datetime_ranges(self):
+        # Tests that hours within overlapping ranges, such as an annual season
+        # alongside monthly seasons, are selected for each range containing
+        # them:
+        tr_0 = [dt(2022,1,1),dt(2022,3,1),dt(2022,4,1)]
+        tr_1 = [dt(2023,1,1),dt(2022,4,1),dt(2022,5,1)]
+        selected_hours = select_hours_within_datetime_ranges(np.array(tr_0),np.array(tr_1),self.hour_filter)
+        for i,(start_datetime,end_datetime) in enumerate(zip(tr_0,tr_1)):
+            expected = select_hours_within_datetime_range(start_datetime,end_datetime,self.hour_filter)
+            pd.testing.assert_frame_equal(
+                selected_hours.loc[selected_hours.loc[:,'RANGE']==i,:].drop(columns='RANGE').reset_index(drop=True),
+                expected
+            )
+
+    def test_select_hours_within_wrapped_datetime_ranges(self):
+        # Tests that a range ending before it starts selects the hours from its
+        # start to the end of the year and from the start of the year to its
+        # end:
+        tr_0 = [dt(2022,11,1),dt(2022,3,1)]
+        tr_1 = [dt(2022,3,1),dt(2022,11,1)]
+        selected_hours = select_hours_within_datetime_ranges(np.array(tr_0),np.array(tr_1),self.hour_filter)
+        expected = pd.concat([
+            select_hours_within_datetime_range(dt(2022,1,1),dt(2022,3,1),self.hour_filter),
+            select_hours_within_datetime_range(dt(2022,11,1),dt(2023,1,1),self.hour_filter),
+        ],ignore_index=True)
+        pd.testing.assert_frame_equal(
+            selected_hours.loc[selected_hours.loc[:,'RANGE']==0,:].drop(columns='RANGE').reset_index(drop=True),
+            expected
+        )
+        pd.testing.assert_frame_equal(
+            selected_hours.loc[selected_hours.loc[:,'RANGE']==1,:].drop(columns='RANGE').reset_index(drop=True),
+            select_hours_within_datetime_range(dt(2022,3,1),dt(2022,11,1),self.hour_filter)
+        )
+
+    def test_coalesce_hour_filter(self):
+        # Tests that contiguous hours with the same resource and DEMAND HOUR
+        # value are combined into blocks, and that gaps and changes in either
+        # value start a new block:
+        start_datetimes = pd.Timestamp(dt(2022,1,1)) + pd.to_timedelta([0,1,2,3,5,6,0,1],unit='h')
+        hour_filter = pd.DataFrame({
+            'RESOURCE ID' : ['A']*6 + ['B']*2,
+            'START DATETIME' : start_datetimes,
+            'END DATETIME' : start_datetimes + pd.Timedelta(hours=1),
+            'DEMAND HOUR' : [True,True,False,False,False,False,False,False],
+        })
+        expected = pd.DataFrame({
+            'RESOURCE ID' : ['A','A','A','B'],
+            'START DATETIME' : pd.Timestamp(dt(2022,1,1)) + pd.to_timedelta([0,2,5,0],unit='h'),
+            'END DATETIME' : pd.Timestamp(dt(2022,1,1)) + pd.to_timedelta([2,4,7,2],unit='h'),
+            'DEMAND HOUR' : [True,False,False,False],
+        })
+        pd.testing.assert_frame_equal(coalesce_hour_filter(hour_filter.iloc[::-1,:]),expected)
+
+if __name__=='__main__':
+    unittest.main()
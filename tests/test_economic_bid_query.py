@@ -25,9 +25,9 @@ class TestEconomicBidQuery(unittest.TestCase):
         #Tests the connection and query to retrieve economic bid data from EZDB.
         start_datetime = dt(2022,7,1,0,0,0)
         end_datetime = dt(2022,8,1,0,0,0)
-        sql_str = get_economic_bid(start_datetime=start_datetime,end_datetime=end_datetime)
+        sql_str,params = get_economic_bid(start_datetime=start_datetime,end_datetime=end_datetime)
         ezdb_connection = EZBDConnection(self.login_credentials)
-        economic_bid_data = ezdb_connection.execute_query(sql_str)
+        economic_bid_data = ezdb_connection.execute_query(sql_str,params)
         print(economic_bid_data)
 
 if __name__=='__main__':
@@ -0,0 +1,110 @@
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from pathlib import Path
+from unittest import mock
+
+sys.path=[str(Path(__file__).parents[1])] + sys.path
+from src.logging.logging import DataLogger
+
+class TestDataLogger(unittest.TestCase):
+    log_dtypes = {
+        'effective_date' : 'datetime64[D]',
+        'source_url' : 'string',
+        'loaded_to_parquet' : 'int64',
+    }
+
+    def setUp(self):
+        # Creates a temporary directory for each test's log file:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.temporary_directory.name) / 'log.csv'
+        self.loggers = []
+
+    def tearDown(self):
+        for logger in self.loggers:
+            logger.close()
+        self.temporary_directory.cleanup()
+
+    def new_logger(self):
+        logger = DataLogger(dtypes=self.log_dtypes,log_path=self.log_path,delimiter=',')
+        self.loggers.append(logger)
+        return logger
+
+    def log_row(self,logger,day:int):
+        logger.log(pd.Series({
+            'effective_date' : pd.Timestamp(2023,1,day),
+            'source_url' : f'https://example.com/{day}',
+            'loaded_to_parquet' : 0,
+        }))
+
+    def test_empty_log(self):
+        # Tests that a logger can be created without a log file and starts
+        # empty with the logger's columns:
+        logger = self.new_logger()
+        self.assertEqual(list(logger.data.columns),['log_timestamp']+list(self.log_dtypes.keys()))
+        self.assertEqual(len(logger.data),0)
+
+    def test_appended_log_round_trip(self):
+        # Tests that rows appended to an existing log file by later commits are
+        # read back along with the rows written first:
+        logger = self.new_logger()
+        self.log_row(logger,1)
+        logger.commit()
+        self.log_row(logger,2)
+        self.log_row(logger,3)
+        logger.commit()
+        logger.close()
+        self.assertEqual(self.log_path.read_text().count('log_timestamp'),1)
+        reloaded = self.new_logger()
+        self.assertEqual(list(reloaded.data.loc[:,'effective_date'].dt.day),[1,2,3])
+        self.assertEqual(list(reloaded.data.loc[:,'source_url']),[f'https://example.com/{day}' for day in [1,2,3]])
+
+    def test_rewrite_after_update(self):
+        # Tests that updating rows already written to file rewrites the file on
+        # the next commit:
+        logger = self.new_logger()
+        self.log_row(logger,1)
+        self.log_row(logger,2)
+        logger.commit()
+        logger.update(slice(None),'loaded_to_parquet',1)
+        self.log_row(logger,3)
+        logger.commit()
+        logger.close()
+        reloaded = self.new_logger()
+        self.assertEqual(len(reloaded.data),3)
+        self.assertEqual(list(reloaded.data.loc[:,'loaded_to_parquet']),[1,1,0])
+
+    def test_single_write_per_batched_block(self):
+        # Tests that commits within a batched block, including nested blocks,
+        # result in a single write when the outermost block exits:
+        logger = self.new_logger()
+        with mock.patch.object(pd.DataFrame,'to_csv',autospec=True,side_effect=pd.DataFrame.to_csv) as to_csv:
+            with logger.batched():
+                for day in range(1,4):
+                    self.log_row(logger,day)
+                    logger.commit()
+                with logger.batched():
+                    self.log_row(logger,4)
+                    logger.commit()
+                self.assertEqual(to_csv.call_count,0)
+            self.assertEqual(to_csv.call_count,1)
+        logger.close()
+        self.assertEqual(len(self.new_logger().data),4)
+
+    def test_load_log_with_missing_columns(self):
+        # Tests that a log file written before columns were added to the logger
+        # is loaded with default values in the new columns and rewritten with
+        # all columns by the next commit:
+        self.log_path.write_text('log_timestamp,effective_date,source_url\n2023-01-01 00:00:00,2023-01-01,https://example.com/1\n')
+        logger = self.new_logger()
+        self.assertEqual(len(logger.data),1)
+        self.assertEqual(logger.data.loc[0,'loaded_to_parquet'],0)
+        self.log_row(logger,2)
+        logger.commit()
+        logger.close()
+        reloaded = self.new_logger()
+        self.assertEqual(list(reloaded.data.loc[:,'source_url']),[f'https://example.com/{day}' for day in [1,2]])
+
+if __name__=='__main__':
+    unittest.main()